@@ -0,0 +1,65 @@
+import sys
+from threading import Lock
+from typing import Any
+from weakref import WeakValueDictionary
+import numpy as np
+
+
+class BufferPool:
+    """Recycles result arrays of equal shape and type between frames. Arrays handed out by empty
+    are given back with release once nobody reads them anymore. A released array is only reused
+    after all other references to it, including views, are gone, so results a caller still holds
+    are never overwritten."""
+
+    def __init__(self, max_free: int = 16):
+        # released arrays kept per (shape, dtype)
+        self.max_free: int = max_free
+        self.allocations: int = 0
+        self.reuses: int = 0
+
+        self._free: dict[tuple, list[np.ndarray]] = {}
+        # arrays handed out and not yet released by id, weak so that results nobody gives back are
+        # freed as usual
+        self._lent: WeakValueDictionary[int, np.ndarray] = WeakValueDictionary()
+        self._lock = Lock()
+
+    def empty(self, shape: tuple, dtype) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key, [])
+            for i in range(len(free)):
+                # referenced only by the free list and the argument
+                if sys.getrefcount(free[i]) <= 2:
+                    buffer = free.pop(i)
+                    self.reuses += 1
+                    break
+            else:
+                buffer = np.empty(shape, dtype)
+                self.allocations += 1
+            self._lent[id(buffer)] = buffer
+        return buffer
+
+    def release(self, value: Any):
+        """Give back the arrays of a result (arrays inside IOTypes, lists and tuples). Arrays that
+        were not handed out by this pool are ignored."""
+        if isinstance(value, (list, tuple)):
+            for v in value:
+                self.release(v)
+            return
+        if not isinstance(value, np.ndarray):
+            value = getattr(value, "value", None)
+            if not isinstance(value, np.ndarray):
+                return
+        with self._lock:
+            if self._lent.get(id(value)) is not value:
+                return
+            del self._lent[id(value)]
+            free = self._free.setdefault((value.shape, value.dtype.str), [])
+            if len(free) < self.max_free:
+                free.append(value)
+
+    def clear(self):
+        with self._lock:
+            self._free.clear()
+            self._lent.clear()
+
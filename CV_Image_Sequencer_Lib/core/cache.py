@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, Optional
+import numpy as np
+
+
+def get_nbytes(value: Any) -> int:
+    """Approximate memory held by a result value (arrays inside IOTypes, lists and tuples)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(get_nbytes(v) for v in value)
+    if hasattr(value, "value"):
+        return get_nbytes(value.value)
+    return 0
+
+
+def same_value(a: Any, b: Any) -> bool:
+    """Exact comparison of result values (arrays inside IOTypes, lists and tuples)."""
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.dtype == b.dtype
+                and np.array_equal(a, b))
+    if isinstance(a, (list, tuple)):
+        return (type(a) is type(b) and len(a) == len(b)
+                and all(same_value(x, y) for x, y in zip(a, b)))
+    if hasattr(a, "value"):
+        return type(a) is type(b) and same_value(a.value, b.value)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+class LRUCache:
+    """Thread safe LRU cache that evicts the least recently used entries once the summed size of
+    all entries exceeds the byte budget."""
+
+    def __init__(self, budget: int):
+        self.budget: int = budget
+        self.used: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        if size is None:
+            size = get_nbytes(value)
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.used -= old[1]
+            self._entries[key] = (value, size)
+            self.used += size
+            self._evict()
+
+    def set_budget(self, budget: int):
+        with self._lock:
+            self.budget = budget
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used = 0
+
+    def _evict(self):
+        while self.used > self.budget and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.used -= size
+
+
+# process wide cache for node results, see Node.cache_key
+RESULT_CACHE = LRUCache(budget=1024**3)
@@ -6,8 +6,11 @@ import cv2 as cv
 from ..utils.source_manager import SourceManager
 from .types import ColorImage, Float, GrayScaleImage, Int, MorphologyTypes, ThresholdType, Contours, String  # Add Contours
 from .nodes import Node, Graph
+from .rolling import SlidingWindowExtremum, SlidingWindowPercentile
 
 class IDXNode(Node):
+    cacheable = False
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [], [("Idx", Int)])
 
@@ -19,6 +22,8 @@ class IDXNode(Node):
 
 
 class SourceNode(Node):
+    keep_serial = True
+
     def __init__(self, graph: Graph, source_manager: SourceManager, n_frames: int = 1,
                  grayscale_mode: bool = False):
 
@@ -42,7 +47,8 @@ class SourceNode(Node):
     @override
     def compute_function(self, inputs):
         offset = inputs[0].value
-        frames = self.source_manager.get_next_n_frames(self.n_frames, offset, self.grayscale_mode)
+        frames = self.source_manager.get_next_n_frames(self.n_frames, offset, self.grayscale_mode,
+                                                       self.frame_idx)
         if frames is None:
             if self.grayscale_mode:
                 frames = [GrayScaleImage(None) for _ in range(self.n_frames)]
@@ -51,6 +57,14 @@ class SourceNode(Node):
         # frames.append(offset)
         return frames
 
+    @override
+    def cache_key_extra(self):
+        frame_idx = self.frame_idx
+        if frame_idx is None:
+            frame_idx = self.source_manager.current_frame_idx
+        return (self.source_manager.source_key(), self.source_manager.loop_mode, frame_idx,
+                self.source_manager.proxy_scale)
+
     @override
     def to_dict(self):
         d = super().to_dict()
@@ -58,7 +72,139 @@ class SourceNode(Node):
         return d
 
 
+class RollingBackgroundNode(SourceNode):
+    """Base of nodes that model the background from the last `window` grayscale frames of the
+    source. While the frames advance one by one only the new frame is pushed into the model,
+    after a jump the model is rebuilt from the frames before.
+
+    Subclasses implement push_frame(frame, inputs), which pushes the next frame and returns the
+    results for the window ending with it."""
+
+    def __init__(self, graph: Graph, source_manager: SourceManager, window: int = 20):
+        super().__init__(graph, source_manager, n_frames=1, grayscale_mode=True)
+        self.window = max(1, window)
+        # last frame pushed into the model and the source it came from
+        self.last_idx: Optional[int] = None
+        self.state_source = None
+
+    def rebuild_start(self, idx: int) -> int:
+        """First frame to push when the model is rebuilt for frame idx."""
+        return max(0, idx - self.window + 1)
+
+    def reset_model(self):
+        pass
+
+    def query(self, inputs: list) -> Optional[list]:
+        """Results for the window ending with the last pushed frame for changed inputs, e.g. another
+        percentile. None if the model cannot answer them without being rebuilt."""
+        return None
+
+    @override
+    def compute_function(self, inputs):
+        empty = [GrayScaleImage(None) for _ in self.result_template]
+        frame_idx = self.frame_idx
+        if frame_idx is None:
+            frame_idx = self.source_manager.current_frame_idx
+        idx = frame_idx + inputs[0].value
+        if idx < 0 or idx >= self.source_manager.get_number_of_frames():
+            return empty
+
+        source = (self.source_manager.source_key(), self.source_manager.proxy_scale)
+        if self.last_idx is not None and idx == self.last_idx and source == self.state_source:
+            results = self.query(inputs)
+            if results is not None:
+                return results
+        if self.last_idx is not None and idx == self.last_idx + 1 and source == self.state_source:
+            start = idx
+        else:
+            start = self.rebuild_start(idx)
+            self.reset_model()
+        self.last_idx = None
+        self.state_source = source
+
+        # the model keeps what it needs of the frames, so a rebuild reads them one by one instead
+        # of holding the window or growing the ring buffer to it
+        for i in range(start, idx + 1):
+            frames = self.source_manager.get_next_n_frames(1, 0, True, i)
+            if frames is None:
+                return empty
+            results = self.push_frame(frames[0].value, inputs)
+        self.last_idx = idx
+        return results
+
+    @override
+    def to_dict(self):
+        d = Node.to_dict(self)
+        d["params"] = {"window": self.window}
+        return d
+
+
+class RollingMinMaxBackgroundNode(RollingBackgroundNode):
+    """Per pixel minimum and maximum over the last `window` frames, each frame costs constant
+    work independent of the window size."""
+
+    def __init__(self, graph: Graph, source_manager: SourceManager, window: int = 20):
+        super().__init__(graph, source_manager, window)
+        self.result_template = [("Min Background", GrayScaleImage), ("Max Background", GrayScaleImage)]
+        self.results = [None for _ in self.result_template]
+        self.name = "RollingMinMaxBackgroundNode"
+
+        self.min_window = SlidingWindowExtremum(self.window, np.minimum)
+        self.max_window = SlidingWindowExtremum(self.window, np.maximum)
+
+    @override
+    def rebuild_start(self, idx: int) -> int:
+        # blocks of the windows are aligned to frame indices
+        return max(0, idx - idx % self.window - self.window)
+
+    @override
+    def reset_model(self):
+        self.min_window.reset()
+        self.max_window.reset()
+
+    @override
+    def push_frame(self, frame, inputs):
+        return [GrayScaleImage(self.min_window.push(frame)), GrayScaleImage(self.max_window.push(frame))]
+
+
+class RollingPercentileBackgroundNode(RollingBackgroundNode):
+    """Per pixel percentile (50 for the median) over the last `window` uint8 frames, maintained
+    with per pixel histograms so that each frame costs O(pixels)."""
+
+    def __init__(self, graph: Graph, source_manager: SourceManager, window: int = 20):
+        super().__init__(graph, source_manager, window)
+        self.parameter_template = self.parameter_template + [("Percentile", Float)]
+        self.external_inputs.append(None)
+        self.default_values.append(Float(50.0))
+        self.min_values.append(Float(0.0))
+        self.max_values.append(Float(100.0))
+        self.result_template = [("Background", GrayScaleImage)]
+        self.results = [None for _ in self.result_template]
+        self.name = "RollingPercentileBackgroundNode"
+
+        self.model = SlidingWindowPercentile(self.window)
+
+    @override
+    def reset_model(self):
+        self.model.reset()
+
+    @override
+    def query(self, inputs):
+        if self.model.counts is None:
+            return None
+        return [GrayScaleImage(self.model.percentile(inputs[1].value))]
+
+    @override
+    def push_frame(self, frame, inputs):
+        if frame.dtype != np.uint8:
+            print("ERROR: RollingPercentileBackgroundNode only supports 8 bit frames.")
+            return [GrayScaleImage(None)]
+        return [GrayScaleImage(self.model.push(frame, inputs[1].value))]
+
+
 class ABSDiffNode(Node):
+    image_params = (0, 1)
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image 1", GrayScaleImage), ("Image 2", GrayScaleImage)],
                          [("Result Image", GrayScaleImage)])
@@ -72,11 +218,18 @@ class ABSDiffNode(Node):
         img2 = inputs[1].value
         if img1 is None or img2 is None:
             return [GrayScaleImage(value=None)]
-        img = cv.absdiff(img1, img2)
+        img = cv.absdiff(img1, img2, dst=self.output_buffer(img1, img2))
         return [GrayScaleImage(value=img)]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        return cv.absdiff
+
 
 class ThresholdNode(Node):
+    image_params = (0,)
+    compare_results = (0,)
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image 1", GrayScaleImage), ("Threshold value", Float),
                                  ("New value", Int), ("Type", ThresholdType)],
@@ -100,11 +253,28 @@ class ThresholdNode(Node):
         if img1 is None:
             return [GrayScaleImage(value=None), Float(value=0), inputs[3]]
 
-        t, img = cv.threshold(img1, inputs[1].value, inputs[2].value, ThresholdType.options[inputs[3].value])
+        t, img = cv.threshold(img1, inputs[1].value, inputs[2].value, ThresholdType.options[inputs[3].value],
+                              dst=self.output_buffer(img1))
         return [GrayScaleImage(value=img), Float(value=t), inputs[3]]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        # Otsu and Triangle derive the threshold from the whole image
+        if inputs[3].value != "Binary":
+            return None
+        thresh, max_value = inputs[1].value, inputs[2].value
+        return lambda tile: cv.threshold(tile, thresh, max_value, cv.THRESH_BINARY)[1]
+
+    @override
+    def fused_results(self, inputs: list, image, dtype):
+        # the threshold as applied to the image type, e.g. rounded down for uint8
+        t, _ = cv.threshold(np.zeros((1, 1), dtype), inputs[1].value, inputs[2].value, cv.THRESH_BINARY)
+        return [GrayScaleImage(value=image), Float(value=t), inputs[3]]
+
 
 class InvertNode(Node):
+    image_params = (0,)
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image 1", GrayScaleImage)],
                          [("Result Image", GrayScaleImage)])
@@ -117,10 +287,16 @@ class InvertNode(Node):
         img1 = inputs[0].value
         if img1 is None:
             return [GrayScaleImage(value=None)]
-        img = cv.bitwise_not(img1)
+        img = cv.bitwise_not(img1, dst=self.output_buffer(img1))
         return [GrayScaleImage(value=img)]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        return cv.bitwise_not
+
 class MinNode(Node):
+    image_params = (0, 1)
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image 1", GrayScaleImage), ("Image 2", GrayScaleImage)],
                          [("Result Image", GrayScaleImage)])
@@ -134,11 +310,17 @@ class MinNode(Node):
         img2 = inputs[1].value
         if img1 is None or img2 is None:
             return [GrayScaleImage(value=None)]
-        img = np.min([img1, img2], axis=0)
+        img = np.minimum(img1, img2, out=self.output_buffer(img1, img2))
         return [GrayScaleImage(value=img)]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        return np.minimum
+
 
 class MaxNode(Node):
+    image_params = (0, 1)
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image 1", GrayScaleImage), ("Image 2", GrayScaleImage)],
                          [("Result Image", GrayScaleImage)])
@@ -152,11 +334,29 @@ class MaxNode(Node):
         img2 = inputs[1].value
         if img1 is None or img2 is None:
             return [GrayScaleImage(value=None)]
-        img = np.max([img1, img2], axis=0)
+        img = np.maximum(img1, img2, out=self.output_buffer(img1, img2))
         return [GrayScaleImage(value=img)]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        return np.maximum
+
+
+def clamped_diff(img1: np.ndarray, img2: np.ndarray, cutoff: int, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """img1 - img2 with differences below the cutoff set to 0, cast to uint8."""
+    if img1.dtype == np.uint8 and img2.dtype == np.uint8 and img1.shape == img2.shape and cutoff >= 0:
+        # no negative difference survives the cutoff, the difference can be saturated in place
+        # instead of computed in int32
+        res = cv.subtract(img1, img2, dst=dst)
+        return cv.threshold(res, cutoff - 1, 0, cv.THRESH_TOZERO, dst=res)[1]
+    res = img1.astype(np.int32) - img2.astype(np.int32)
+    res[res < cutoff] = 0
+    return res.astype(np.uint8)
+
 
 class ClampedDiffNode(Node):
+    image_params = (0, 1)
+
     def __init__(self, graph: Graph):
         super().__init__(graph,
                          parameter_template=[
@@ -182,11 +382,16 @@ class ClampedDiffNode(Node):
         img2 = inputs[1].value
         if img1 is None or img2 is None:
             return [GrayScaleImage(value=None)]
-        res = img1.astype(np.int32) - img2.astype(np.int32)
-        res[res < inputs[2].value] = 0
-        res = res.astype(np.uint8)
+        res = clamped_diff(img1, img2, inputs[2].value, self.output_buffer(img1, img2))
         return [GrayScaleImage(value=res)]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        cutoff = inputs[2].value
+        if dtype != np.uint8 or cutoff < 0:
+            return None
+        return lambda tile1, tile2: clamped_diff(tile1, tile2, cutoff)
+
 
 class SplitChannelNode(Node):
     def __init__(self, graph: Graph):
@@ -203,11 +408,20 @@ class SplitChannelNode(Node):
         if img1 is None:
             return [GrayScaleImage(value=None), GrayScaleImage(value=None), GrayScaleImage(value=None)]
 
-        ch1, ch2, ch3 = cv.split(img1)
+        if not all(self.result_wanted(i) for i in range(3)):
+            return [GrayScaleImage(value=cv.extractChannel(img1, i, dst=self.output_buffer(img1[..., 0])))
+                    if self.result_wanted(i) else GrayScaleImage(value=None) for i in range(3)]
+
+        buffers = None
+        if img1.ndim == 3 and self.graph.buffer_pool is not None:
+            buffers = [self.output_buffer(img1[..., 0]) for _ in range(img1.shape[2])]
+        ch1, ch2, ch3 = cv.split(img1, buffers)
         return [GrayScaleImage(value=ch1), GrayScaleImage(ch2), GrayScaleImage(ch3)]
 
 
 class RegionOfInterestNode(Node):
+    pixel_params = {1: 1, 2: 1, 3: 1, 4: 1}
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image", GrayScaleImage), ("x", Int), ("y", Int),
                                  ("width", Int), ("height", Int)],
@@ -242,6 +456,8 @@ class RegionOfInterestNode(Node):
 
 
 class ErodeNode(Node):
+    pixel_params = {1: 1}
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image", GrayScaleImage), ("kernelSize", Int),
                                  ("iterations", Int)],
@@ -263,10 +479,12 @@ class ErodeNode(Node):
             return [GrayScaleImage(value=None)]
 
         kernel = np.ones((inputs[1].value, inputs[1].value))
-        res = cv.erode(img, kernel, iterations=inputs[2].value)
+        res = cv.erode(img, kernel, dst=self.output_buffer(img), iterations=inputs[2].value)
         return [GrayScaleImage(value=res)]
 
 class DilateNode(Node):
+    pixel_params = {1: 1}
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image", GrayScaleImage), ("kernelSize", Int),
                                  ("iterations", Int)],
@@ -288,11 +506,13 @@ class DilateNode(Node):
             return [GrayScaleImage(value=None)]
 
         kernel = np.ones((inputs[1].value, inputs[1].value))
-        res = cv.dilate(img, kernel, iterations=inputs[2].value)
+        res = cv.dilate(img, kernel, dst=self.output_buffer(img), iterations=inputs[2].value)
         return [GrayScaleImage(value=res)]
 
 
 class PixelwiseAnd(Node):
+    image_params = (0, 1)
+
     def __init__(self, graph: Graph):
         super().__init__(graph,
                          parameter_template=[
@@ -313,10 +533,16 @@ class PixelwiseAnd(Node):
         img2 = inputs[1].value
         if img1 is None or img2 is None:
             return [GrayScaleImage(value=None)]
-        res = cv.bitwise_and(img1, img2)
+        res = cv.bitwise_and(img1, img2, dst=self.output_buffer(img1, img2))
         return [GrayScaleImage(value=res)]
 
+    @override
+    def tile_function(self, inputs: list, dtype):
+        return cv.bitwise_and
+
 class MorphologyOperationNode(Node):
+    pixel_params = {2: 1}
+
     def __init__(self, graph: Graph):
         super().__init__(graph, [("Image", GrayScaleImage), ("operation", MorphologyTypes), ("kernelSize", Int),
                                  ("iterations", Int)],
@@ -339,10 +565,13 @@ class MorphologyOperationNode(Node):
             return [GrayScaleImage(value=None)]
 
         kernel = np.ones((inputs[2].value, inputs[2].value))
-        res = cv.morphologyEx(img, MorphologyTypes.options[inputs[1].value], kernel, iterations=inputs[3].value)
+        res = cv.morphologyEx(img, MorphologyTypes.options[inputs[1].value], kernel,
+                              dst=self.output_buffer(img), iterations=inputs[3].value)
         return [GrayScaleImage(value=res)]
 
 class FindContoursNode(Node):
+    pixel_params = {7: 1}
+
     def __init__(self, graph: Graph):
         super().__init__(graph, 
                          parameter_template=[
@@ -398,6 +627,8 @@ class FindContoursNode(Node):
         
         # Find contours on the input image
         contours, _ = cv.findContours(img, inputs[2].value, inputs[3].value)
+        if not self.result_wanted(0):
+            return [ColorImage(value=None), Int(len(contours)), Contours(value=contours)]
         
         # Convert draw image to color if it's grayscale
         if len(draw_img.shape) == 2:
@@ -415,6 +646,10 @@ class FindContoursNode(Node):
 
 
 class SaveContourCropsNode(Node):
+    cacheable = False
+    keep_serial = True
+    pixel_params = {2: 1, 3: 2}
+
     def __init__(self, graph: Graph):
         super().__init__(graph, 
                          parameter_template=[
@@ -472,6 +707,9 @@ class SaveContourCropsNode(Node):
 
     @override
     def compute_function(self, inputs: list):
+        if self.proxy_mode():
+            return [Int(value=0), String(value=""),
+                    String(value="Disabled in proxy mode: crops are only saved at full resolution")]
         if inputs[0] is None or inputs[1] is None:
             return [Int(value=0), String(value=""), String(value="Error: Missing inputs")]
         
@@ -521,6 +759,9 @@ class SaveContourCropsNode(Node):
         return [Int(value=saved_count), String(value=self.output_directory), String(value=status)]  # Changed return
 
 class ClassificationNode(Node):
+    cacheable = False
+    keep_serial = True
+
     def __init__(self, graph: Graph):
         super().__init__(graph, 
                          parameter_template=[
@@ -622,6 +863,10 @@ class ClassificationNode(Node):
         print("=" * 80)
         print("ClassificationNode.compute_function called!")
         
+        if self.proxy_mode():
+            print("ERROR: Classification is disabled in proxy mode")
+            return [ColorImage(value=None), Int(value=0),
+                    String(value="Disabled in proxy mode: classifications are only written at full resolution")]
         if inputs[0] is None:
             print("ERROR: Missing image")
             return [ColorImage(value=None), Int(value=0), String(value="Error: Missing image")]
@@ -780,14 +1025,15 @@ class ClassificationNode(Node):
             results_df.to_csv(self.output_csv, index=False)
             print(f"Results saved to {self.output_csv}")
             
-            # Create annotated image
-            annotated_img = original_img.copy()
+            # Create annotated image, every crop is located by template matching so this is skipped
+            # if nobody reads the image
+            annotated_img = None
+            crops = []
+            if self.result_wanted(0):
+                annotated_img = original_img.copy()
+                crops = zip(crop_paths, predictions, probabilities, ood_flags, filenames)
             
-            for i, (crop_path, prediction, probability, is_ood, filename) in enumerate(zip(crop_paths, 
-                                                                                             predictions, 
-                                                                                             probabilities, 
-                                                                                             ood_flags,
-                                                                                             filenames)):
+            for i, (crop_path, prediction, probability, is_ood, filename) in enumerate(crops):
                 print(f"Processing crop {i}: {filename} -> {prediction[0]}, prob: {probability[0]:.2f}, OOD: {is_ood}")
                 
                 # Load the crop
@@ -839,7 +1085,8 @@ class ClassificationNode(Node):
                           cv.FONT_HERSHEY_SIMPLEX, self.font_scale, (255, 255, 255),
                           self.font_thickness, cv.LINE_AA)
             
-            print(f"Annotated {len(predictions)} crops")
+            if annotated_img is not None:
+                print(f"Annotated {len(predictions)} crops")
             status = f"Classified {len(predictions)} crops. Results saved to {self.output_csv}"
             return [ColorImage(value=annotated_img), Int(value=len(predictions)), String(value=status)]
             
@@ -850,6 +1097,8 @@ class ClassificationNode(Node):
             return [ColorImage(value=None), Int(value=0), String(value=error_msg)]
 
 class DeconvolutionNode(Node):
+    keep_serial = True
+
     def __init__(self, graph: Graph):
         super().__init__(graph, 
                          parameter_template=[
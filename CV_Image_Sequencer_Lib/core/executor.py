@@ -0,0 +1,606 @@
+import argparse
+import json
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import perf_counter, thread_time
+from typing import Any, Iterable, Iterator, Optional
+import numpy as np
+
+from ..utils.source_manager import SourceManager
+from .custom_nodes import SourceNode
+from .fusion import FusedGroup, run_tiled
+from .buffers import BufferPool
+from .cache import get_nbytes
+from .nodes import Node, Graph
+from .profiling import NodeProfile, format_profiles
+from .types import IOType, Serializable
+
+
+@dataclass
+class ExecutionStep:
+    node: Node
+    # per parameter: (index of the producing step, result index) or None if unconnected
+    inputs: list[Optional[tuple[int, int]]]
+    # indices of the steps consuming results of this step
+    consumers: list[int] = field(default_factory=list)
+    # number of distinct steps this step waits for
+    n_dependencies: int = 0
+    # length of the longest path from a step without inputs
+    depth: int = 0
+
+
+class GraphExecutor:
+    """Runs a workflow headless: the graph is sorted once into a flat list of steps which is
+    executed per frame without recursion and without emitting any Qt signal.
+
+    With n_workers > 1 steps whose inputs are ready run concurrently on a thread pool, except for
+    nodes with keep_serial which are run on the calling thread. run_pipelined instead splits the plan
+    into stages that work on consecutive frames at the same time.
+
+    Chains of pixelwise nodes (Node.image_params) whose intermediate images are not used elsewhere
+    are fused: they run in one pass over row tiles when the last node of the chain is reached.
+    Nodes in inspected and nodes of requested outputs (set_outputs) keep their results although
+    they are part of a chain.
+
+    With compare_results the results in Node.compare_results are compared with those of the
+    previous frame so that unchanged results do not recompute downstream nodes. These results are
+    materialized and end a fused chain, so comparing only pays off for expensive downstream nodes.
+
+    With recycle_buffers nodes draw their result arrays from a buffer pool. Results that are only
+    read by other steps are given back to the pool, and dropped from the results of the frame, once
+    the last of these steps ran. Outputs of the workflow and results of inspected nodes are kept
+    and given back by run and run_pipelined once the caller is done with the frame."""
+
+    def __init__(self, source_manager: SourceManager, graph: Optional[Graph] = None,
+                 n_workers: int = 1, fuse: bool = True, recycle_buffers: bool = False,
+                 compare_results: bool = False):
+        self.source_manager = source_manager
+        self.graph = graph if graph is not None else Graph()
+        self.uuid_to_node: dict[str, Node] = {}
+        self.plan: list[ExecutionStep] = []
+        self.node_to_step: dict[Node, int] = {}
+
+        self.fuse = fuse
+        self.compare_results = compare_results
+        self.inspected: set[Node] = set()
+        # fused groups by the index of their tail step, and the other steps of all groups
+        self.fused_groups: dict[int, FusedGroup] = {}
+        self.fused_steps: set[int] = set()
+
+        self.buffer_pool: Optional[BufferPool] = BufferPool() if recycle_buffers else None
+        # per step the steps whose results it is the last to read once it ran, the number of
+        # such readers per step and the result indices read by other steps
+        self.release_after: list[list[int]] = []
+        self.n_readers: list[int] = []
+        self.consumed_results: list[set[int]] = []
+        # results requested from the run besides the consumed ones, None for all, see set_outputs
+        self.outputs: Optional[set[tuple[Node, int]]] = None
+        # per step the consumed results that are not requested and can be given back
+        self.released_results: list[set[int]] = []
+
+        self.n_workers = n_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        if graph is not None:
+            self.compile()
+
+    @classmethod
+    def from_file(cls, path: str, source_manager: SourceManager, n_workers: int = 1,
+                  fuse: bool = True, recycle_buffers: bool = False,
+                  compare_results: bool = False) -> "GraphExecutor":
+        with open(path, "r") as f:
+            state = json.load(f)
+        executor = cls(source_manager, n_workers=n_workers, fuse=fuse, recycle_buffers=recycle_buffers,
+                       compare_results=compare_results)
+        executor.load_state(state)
+        return executor
+
+    def load_state(self, state: dict):
+        """Build the graph from a workflow dict as written by GraphVis.to_dict."""
+        self.graph = Graph()
+        self.uuid_to_node = {}
+        self.outputs = None
+
+        for uuid, node_vis_info in state["nodes"].items():
+            node_info = node_vis_info["node"]
+            node_type = Serializable._registry[node_info["node_type"]]
+            if not issubclass(node_type, Node):
+                continue
+
+            if issubclass(node_type, SourceNode):
+                node = node_type(self.graph, self.source_manager, **node_info["params"])
+            else:
+                node = node_type(self.graph, **node_info["params"])
+
+            external_inputs: list[Optional[IOType]] = []
+            for i, (_, dtype) in enumerate(node.parameter_template):
+                if node_info["external_inputs"][i] is None:
+                    external_inputs.append(None)
+                else:
+                    external_inputs.append(dtype(node_info["external_inputs"][i]))
+            node.external_inputs = external_inputs
+
+            self.graph.add_node(node)
+            self.uuid_to_node[uuid] = node
+
+        for param_uuid, connection_data in state["connections"].items():
+            for (param_idx, result_uuid, result_idx) in connection_data:
+                self.graph.connect_nodes(self.uuid_to_node[param_uuid], param_idx,
+                                         self.uuid_to_node[result_uuid], result_idx)
+        self.compile()
+
+    def compile(self):
+        """Sort the graph topologically (Kahn) into the execution plan."""
+        n_missing = {}
+        consumers: dict[Node, list[Node]] = {node: [] for node in self.graph.nodes}
+        for node in self.graph.nodes:
+            inputs = {c[0] for c in self.graph.connections[node] if c is not None}
+            n_missing[node] = len(inputs)
+            for input_node in inputs:
+                consumers[input_node].append(node)
+
+        ready = [node for node in self.graph.nodes if n_missing[node] == 0]
+        order: list[Node] = []
+        while ready:
+            node = ready.pop(0)
+            order.append(node)
+            for consumer in consumers[node]:
+                n_missing[consumer] -= 1
+                if n_missing[consumer] == 0:
+                    ready.append(consumer)
+
+        if len(order) != len(self.graph.nodes):
+            raise ValueError("The workflow contains a cycle and cannot be executed")
+
+        self.node_to_step = {node: i for i, node in enumerate(order)}
+        self.plan = []
+        for node in order:
+            inputs = []
+            for connection in self.graph.connections[node]:
+                if connection is None:
+                    inputs.append(None)
+                else:
+                    inputs.append((self.node_to_step[connection[0]], connection[1]))
+            self.plan.append(ExecutionStep(node, inputs))
+
+        for i, step in enumerate(self.plan):
+            dependencies = {c[0] for c in step.inputs if c is not None}
+            step.n_dependencies = len(dependencies)
+            for dependency in dependencies:
+                self.plan[dependency].consumers.append(i)
+                step.depth = max(step.depth, self.plan[dependency].depth + 1)
+
+        self.graph.buffer_pool = self.buffer_pool
+        self.graph.compare_results = self.compare_results
+        self._fuse_steps()
+
+    def _fuse_steps(self):
+        """Group pixelwise steps whose only consumer is a pixelwise step reading their image as an
+        image parameter with that consumer."""
+        self.fused_groups = {}
+        self.fused_steps = set()
+        fused_into: dict[int, int] = {}
+        requested = set() if self.outputs is None else {node for node, _ in self.outputs}
+        for i, step in enumerate(self.plan):
+            # compared results have to be materialized, they end a chain like inspected nodes
+            compared = self.compare_results and 0 in step.node.compare_results
+            if (not self.fuse or not step.node.image_params or step.node in self.inspected
+                    or step.node in requested or compared or len(step.consumers) != 1):
+                continue
+            consumer = self.plan[step.consumers[0]]
+            links = [p for p, c in enumerate(consumer.inputs) if c is not None and c[0] == i]
+            if consumer.node.image_params and all(p in consumer.node.image_params and
+                                                  consumer.inputs[p][1] == 0 for p in links):
+                fused_into[i] = step.consumers[0]
+
+        members: dict[int, list[int]] = {}
+        for i in fused_into:
+            tail = i
+            while tail in fused_into:
+                tail = fused_into[tail]
+            members.setdefault(tail, []).append(i)
+
+        for tail, steps in members.items():
+            # plan order is a valid execution order within the group
+            steps = sorted(steps) + [tail]
+            position = {step_idx: pos for pos, step_idx in enumerate(steps)}
+            links = []
+            for step_idx in steps:
+                step = self.plan[step_idx]
+                links.append([position.get(step.inputs[p][0]) if step.inputs[p] is not None else None
+                              for p in step.node.image_params])
+            self.fused_groups[tail] = FusedGroup(steps, links)
+            self.fused_steps.update(steps[:-1])
+        self._plan_releases()
+        self._plan_demand()
+
+    def _plan_releases(self):
+        self.release_after = []
+        self.consumed_results = [set() for _ in self.plan]
+        for i, step in enumerate(self.plan):
+            producers = {c[0] for c in step.inputs if c is not None}
+            for c in step.inputs:
+                if c is not None:
+                    self.consumed_results[c[0]].add(c[1])
+            if i in self.fused_steps:
+                # read when the tail of the group runs
+                producers = set()
+            elif i in self.fused_groups:
+                group_steps = self.fused_groups[i].steps
+                producers = {c[0] for s in group_steps for c in self.plan[s].inputs
+                             if c is not None} - set(group_steps)
+            self.release_after.append(sorted(producers))
+
+        self.n_readers = [0 for _ in self.plan]
+        for producers in self.release_after:
+            for producer in producers:
+                self.n_readers[producer] += 1
+
+    def _plan_demand(self):
+        """Tell every node which of its results are read, nodes skip computing the others."""
+        self.released_results = []
+        for i, step in enumerate(self.plan):
+            requested = set() if self.outputs is None else {idx for node, idx in self.outputs if node is step.node}
+            self.released_results.append(self.consumed_results[i] - requested)
+            if self.outputs is None or step.node in self.inspected:
+                step.node.wanted_results = None
+            else:
+                step.node.wanted_results = self.consumed_results[i] | requested
+
+    def set_outputs(self, outputs: Optional[Iterable[tuple[str, int]]]):
+        """Request only these (node uuid, result idx) besides the results consumed by other nodes.
+        Other results may be left empty. None requests all results."""
+        self.outputs = None if outputs is None else {(self.uuid_to_node[uuid], idx) for uuid, idx in outputs}
+        # requested results are materialized, which may end fused chains
+        self._fuse_steps()
+
+    def _release_inputs(self, step_idx: int, results: list, n_readers: list[int]):
+        """Give the results the step was the last to read back to the buffer pool."""
+        if self.buffer_pool is None:
+            return
+        for producer in self.release_after[step_idx]:
+            n_readers[producer] -= 1
+            if n_readers[producer] > 0 or self.plan[producer].node in self.inspected:
+                continue
+            producer_results = list(results[producer])
+            for idx in self.released_results[producer]:
+                data = producer_results[idx]
+                if isinstance(data, IOType) and isinstance(data.value, np.ndarray):
+                    producer_results[idx] = type(data)(value=None)
+                    self.buffer_pool.release(data.value)
+            node = self.plan[producer].node
+            if node.results is results[producer]:
+                node.results = producer_results
+            results[producer] = producer_results
+
+    def _release_outputs(self, results: list):
+        """Give back the remaining results of a frame the caller is done with. Arrays the caller
+        still references are not reused."""
+        if self.buffer_pool is not None:
+            self.buffer_pool.release(results)
+
+    def set_inspected(self, nodes: Iterable[Node]):
+        """Materialize the results of these nodes even if they are part of a fused chain."""
+        self.inspected = set(nodes)
+        self._fuse_steps()
+
+    def set_recycle_buffers(self, recycle_buffers: bool):
+        self.buffer_pool = BufferPool() if recycle_buffers else None
+        self.graph.buffer_pool = self.buffer_pool
+
+    def set_n_workers(self, n_workers: int):
+        self.close()
+        self.n_workers = n_workers
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _collect_inputs(self, step: ExecutionStep, results: list, fingerprints: list,
+                        pending: Iterable[int] = ()) -> tuple[list, list]:
+        """Inputs and upstream fingerprints of the step, inputs from pending steps stay None."""
+        inputs = []
+        upstream = []
+        for connection in step.inputs:
+            if connection is None:
+                inputs.append(None)
+                upstream.append(None)
+            else:
+                pending_input = connection[0] in pending
+                inputs.append(None if pending_input else results[connection[0]][connection[1]])
+                upstream.append(fingerprints[connection[0]][connection[1]])
+        return inputs, upstream
+
+    def _evaluate_step(self, step_idx: int, frame_idx: int, results: list, fingerprints: list):
+        if step_idx in self.fused_groups:
+            self._evaluate_fused(self.fused_groups[step_idx], frame_idx, results, fingerprints)
+        elif step_idx not in self.fused_steps:
+            self._evaluate_single(step_idx, frame_idx, results, fingerprints)
+        # steps of a fused group are evaluated with its tail
+
+    def _evaluate_single(self, step_idx: int, frame_idx: int, results: list, fingerprints: list):
+        step = self.plan[step_idx]
+        inputs, upstream = self._collect_inputs(step, results, fingerprints)
+        results[step_idx] = step.node.evaluate(inputs, frame_idx, upstream)
+        fingerprints[step_idx] = step.node.result_fingerprints
+
+    def _evaluate_fused(self, group: FusedGroup, frame_idx: int, results: list, fingerprints: list):
+        """Evaluate the group in one tiled pass. Falls back to evaluating its steps one by one if
+        the images differ in shape or type or a node cannot be fused for its inputs. The time of the
+        pass is recorded in the profile of the tail."""
+        start, start_cpu = perf_counter(), thread_time()
+        all_inputs = []
+        keys = []
+        images: list[np.ndarray] = []
+        arguments = []
+        for step_idx, links in zip(group.steps, group.links):
+            step = self.plan[step_idx]
+            node = step.node
+            node.frame_idx = frame_idx
+            inputs, upstream = self._collect_inputs(step, results, fingerprints, group.steps)
+            inputs = node.scale_pixel_params(node.fill_inputs(inputs))
+            keys.append(node.cache_key(inputs, upstream))
+            node.set_fingerprint(keys[-1])
+            fingerprints[step_idx] = node.result_fingerprints
+            all_inputs.append(inputs)
+
+            args = []
+            for param, link in zip(node.image_params, links):
+                if link is not None:
+                    args.append(link)
+                    continue
+                data = inputs[param]
+                image = data.value if data is not None else None
+                if not isinstance(image, np.ndarray) or image.size == 0 or \
+                        (images and (image.shape != images[0].shape or image.dtype != images[0].dtype)):
+                    return self._evaluate_unfused(group, frame_idx, results, fingerprints)
+                images.append(image)
+                args.append(image)
+            arguments.append(args)
+
+        dtype = images[0].dtype
+        functions = [self.plan[step_idx].node.tile_function(inputs, dtype)
+                     for step_idx, inputs in zip(group.steps, all_inputs)]
+        if any(function is None for function in functions):
+            return self._evaluate_unfused(group, frame_idx, results, fingerprints)
+
+        for step_idx, inputs in zip(group.steps[:-1], all_inputs):
+            node = self.plan[step_idx].node
+            node.results = results[step_idx] = node.fused_results(inputs, None, dtype)
+
+        tail = self.plan[group.steps[-1]].node
+        tail_results = tail.lookup_results(keys[-1])
+        cache_hit = tail_results is not None
+        if tail_results is None:
+            empty = self.buffer_pool.empty if self.buffer_pool is not None else np.empty
+            tail_results = tail.fused_results(all_inputs[-1], run_tiled(functions, arguments, empty), dtype)
+            tail.store_results(keys[-1], tail_results)
+        tail.update_result_fingerprints(tail_results)
+        tail.results = results[group.steps[-1]] = tail_results
+        fingerprints[group.steps[-1]] = tail.result_fingerprints
+        tail.profile.record(perf_counter() - start, thread_time() - start_cpu, cache_hit,
+                            get_nbytes(tail_results))
+
+    def _evaluate_unfused(self, group: FusedGroup, frame_idx: int, results: list, fingerprints: list):
+        for step_idx in group.steps:
+            self._evaluate_single(step_idx, frame_idx, results, fingerprints)
+
+    def run_frame(self, frame_idx: int) -> list[list[Any]]:
+        """Execute the plan for a single frame and return the results of every step."""
+        results: list[Any] = [None for _ in self.plan]
+        fingerprints: list[Optional[list[int]]] = [None for _ in self.plan]
+        n_readers = list(self.n_readers)
+        if self.n_workers <= 1:
+            for i in range(len(self.plan)):
+                self._evaluate_step(i, frame_idx, results, fingerprints)
+                self._release_inputs(i, results, n_readers)
+            return results
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.n_workers)
+
+        n_missing = [step.n_dependencies for step in self.plan]
+        ready = deque(i for i, n in enumerate(n_missing) if n == 0)
+        running: dict[Future, int] = {}
+        n_done = 0
+
+        def finish(step_idx: int):
+            nonlocal n_done
+            n_done += 1
+            self._release_inputs(step_idx, results, n_readers)
+            for consumer in self.plan[step_idx].consumers:
+                n_missing[consumer] -= 1
+                if n_missing[consumer] == 0:
+                    ready.append(consumer)
+
+        while n_done < len(self.plan):
+            while ready:
+                step_idx = ready.popleft()
+                if self.plan[step_idx].node.keep_serial:
+                    self._evaluate_step(step_idx, frame_idx, results, fingerprints)
+                    finish(step_idx)
+                else:
+                    future = self._pool.submit(self._evaluate_step, step_idx, frame_idx, results,
+                                               fingerprints)
+                    running[future] = step_idx
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                    finish(running.pop(future))
+        return results
+
+    def run(self, start: int = 0, stop: Optional[int] = None) -> Iterator[tuple[int, list[list[Any]]]]:
+        if stop is None:
+            stop = self.source_manager.get_number_of_frames()
+        for frame_idx in range(start, stop):
+            results = self.run_frame(frame_idx)
+            yield frame_idx, results
+            self._release_outputs(results)
+
+    def split_stages(self, n_stages: int) -> list[list[int]]:
+        """Group the steps into at most n_stages stages by their depth. A step only consumes
+        results of steps in the same or an earlier stage."""
+        if not self.plan:
+            return []
+        n_levels = max(step.depth for step in self.plan) + 1
+        n_stages = max(1, min(n_stages, n_levels))
+        stages: list[list[int]] = [[] for _ in range(n_stages)]
+        for i, step in enumerate(self.plan):
+            stages[step.depth * n_stages // n_levels].append(i)
+        return stages
+
+    def run_pipelined(self, start: int = 0, stop: Optional[int] = None, n_stages: int = 4,
+                      queue_size: int = 2) -> Iterator[tuple[int, list[list[Any]]]]:
+        """Like run, but every stage runs on its own thread so that e.g. frame N+1 is decoded
+        while frame N is thresholded. Queues between the stages hold at most queue_size frames.
+        Results are yielded in frame order."""
+        if stop is None:
+            stop = self.source_manager.get_number_of_frames()
+        stages = self.split_stages(n_stages)
+        queues: list[Queue] = [Queue(maxsize=queue_size) for _ in stages]
+        aborted = Event()
+
+        def put(queue: Queue, item):
+            while not aborted.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return
+                except Full:
+                    pass
+
+        def get(queue: Queue):
+            while not aborted.is_set():
+                try:
+                    return queue.get(timeout=0.1)
+                except Empty:
+                    pass
+
+        def run_stage(stage_idx: int):
+            if stage_idx == 0:
+                frames = ((i, [None for _ in self.plan], [None for _ in self.plan], list(self.n_readers))
+                          for i in range(start, stop))
+            else:
+                frames = iter(lambda: get(queues[stage_idx - 1]), None)
+            try:
+                for frame_idx, results, fingerprints, n_readers in frames:
+                    if aborted.is_set():
+                        return
+                    for step_idx in stages[stage_idx]:
+                        self._evaluate_step(step_idx, frame_idx, results, fingerprints)
+                        self._release_inputs(step_idx, results, n_readers)
+                    put(queues[stage_idx], (frame_idx, results, fingerprints, n_readers))
+            except Exception as e:
+                put(queues[-1], e)
+                return
+            put(queues[stage_idx], None)
+
+        threads = [Thread(target=run_stage, args=(i,), daemon=True) for i in range(len(stages))]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = get(queues[-1])
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item[0], item[1]
+                self._release_outputs(item[1])
+        finally:
+            aborted.set()
+            for thread in threads:
+                thread.join()
+
+    def get_node_results(self, results: list[list[Any]], uuid: str) -> list[Any]:
+        return results[self.node_to_step[self.uuid_to_node[uuid]]]
+
+    def get_sink_outputs(self) -> list[tuple[str, int]]:
+        """(node uuid, result idx) of all results that are not consumed by another node."""
+        consumed = set()
+        for connection in self.graph.connections.values():
+            consumed.update(c for c in connection if c is not None)
+        outputs = []
+        for uuid, node in self.uuid_to_node.items():
+            for idx in range(len(node.result_template)):
+                if (node, idx) not in consumed:
+                    outputs.append((uuid, idx))
+        return outputs
+
+    def get_profiles(self) -> dict[str, NodeProfile]:
+        """Profiles of the nodes by uuid. Nodes fused into a chain are profiled with its last node."""
+        return {uuid: node.profile for uuid, node in self.uuid_to_node.items()}
+
+    def format_profiles(self) -> str:
+        return format_profiles((f"{node.name or type(node).__name__} {uuid[:8]}", node.profile)
+                               for uuid, node in self.uuid_to_node.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a workflow without the GUI.")
+    parser.add_argument("workflow", help="Workflow json file")
+    parser.add_argument("source", help="Video file, image directory, frame store, multi page TIFF or HDF5 file (container.h5:/dataset)")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="Threads per frame")
+    parser.add_argument("--stages", type=int, default=1,
+                        help="Number of pipeline stages working on consecutive frames")
+    parser.add_argument("--decode-workers", type=int, default=None,
+                        help="Threads decoding the images of a directory source")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Number of processes the frame range is sharded across")
+    parser.add_argument("--no-fusion", action="store_true",
+                        help="Evaluate chains of pixelwise nodes node by node")
+    parser.add_argument("--recycle-buffers", action="store_true",
+                        help="Reuse the result arrays of earlier frames instead of caching results")
+    parser.add_argument("--compare-results", action="store_true",
+                        help="Skip downstream nodes while compared results like masks do not change")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print the time spent per node after a run in a single process")
+    args = parser.parse_args()
+
+    if args.processes > 1:
+        if args.profile:
+            parser.error("--profile is not supported with --processes")
+        from .sharding import run_sharded
+        # the results are not used, see below
+        for frame_idx, _ in run_sharded(args.workflow, args.source, args.start, args.stop,
+                                        args.processes, outputs=[], n_workers=args.workers,
+                                        n_stages=args.stages, fuse=not args.no_fusion,
+                                        recycle_buffers=args.recycle_buffers,
+                                        compare_results=args.compare_results,
+                                        decode_workers=args.decode_workers):
+            print(f"Processed frame {frame_idx}")
+        return
+
+    source_manager = SourceManager(args.decode_workers)
+    source_manager.loop_mode = False
+    source_manager.load_source(args.source)
+
+    with GraphExecutor.from_file(args.workflow, source_manager, args.workers,
+                                 not args.no_fusion, args.recycle_buffers,
+                                 args.compare_results) as executor:
+        # the results are not used, only nodes with side effects like saving crops matter
+        executor.set_outputs([])
+        if args.stages > 1:
+            frames = executor.run_pipelined(args.start, args.stop, args.stages)
+        else:
+            frames = executor.run(args.start, args.stop)
+        for frame_idx, _ in frames:
+            print(f"Processed frame {frame_idx}")
+        if args.profile:
+            print(executor.format_profiles())
+
+
+if __name__ == "__main__":
+    main()
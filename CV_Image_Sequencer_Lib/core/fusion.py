@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+import numpy as np
+
+# bytes of a row tile of one image, the tiles of all nodes of a chain stay in the L2 cache
+TILE_BYTES = 64 * 1024
+
+
+@dataclass
+class FusedGroup:
+    """Pixelwise steps that are evaluated in one pass over row tiles when the last step, the tail,
+    is executed. Intermediate results only live as tiles, only the tail result is materialized."""
+    # step indices in execution order, the tail last
+    steps: list[int]
+    # per step and image parameter: position in steps of the producing step, None for images
+    # from outside the group
+    links: list[list[Optional[int]]]
+
+
+def run_tiled(functions: list[Callable[..., np.ndarray]],
+              arguments: list[list[Union[int, np.ndarray]]],
+              empty: Callable[..., np.ndarray] = np.empty) -> np.ndarray:
+    """Apply the functions one after the other to row tiles and return the assembled result of the
+    last function. arguments holds the image arguments of every function: whole images, which are
+    sliced into tiles, or the position of an earlier function whose tile is passed on. All images
+    have the same shape and at least one row. The result is allocated with empty."""
+    image = next(a for args in arguments for a in args if isinstance(a, np.ndarray))
+    height = image.shape[0]
+    n_rows = max(1, TILE_BYTES // (image[0].nbytes or 1))
+
+    out: Optional[np.ndarray] = None
+    for start in range(0, height, n_rows):
+        stop = start + n_rows
+        tiles: list[np.ndarray] = []
+        for function, args in zip(functions, arguments):
+            tiles.append(function(*[tiles[a] if isinstance(a, int) else a[start:stop] for a in args]))
+        if out is None:
+            out = empty((height,) + tiles[-1].shape[1:], tiles[-1].dtype)
+        out[start:stop] = tiles[-1]
+    return out
@@ -1,7 +1,38 @@
-from typing import IO, Any, Optional
+from collections import OrderedDict
+from typing import IO, Any, Callable, Hashable, Optional
+from itertools import count
+from threading import Lock
+from time import perf_counter, thread_time
 from PySide6.QtCore import QObject, Signal, Slot
+from .buffers import BufferPool
+from .cache import RESULT_CACHE, get_nbytes, same_value
+from .profiling import NodeProfile
 from .types import IOType, Serializable
 
+# fingerprints for results that cannot be cached, unique so that they never match a cache key
+_uncached_fingerprints = count(-1, -1)
+_node_ids = count()
+
+# ids of the recently seen cache keys; a key evicted and seen again gets a new id, which only costs
+# cache hits, distinct keys never share an id
+MAX_FINGERPRINTS = 1 << 16
+_fingerprint_ids: OrderedDict[Hashable, int] = OrderedDict()
+_next_fingerprint = count(1)
+_fingerprint_lock = Lock()
+
+
+def intern_fingerprint(key: Hashable) -> int:
+    """Positive id that is equal for equal keys and differs for different keys, unlike hash(key)."""
+    with _fingerprint_lock:
+        fingerprint = _fingerprint_ids.get(key)
+        if fingerprint is None:
+            fingerprint = _fingerprint_ids[key] = next(_next_fingerprint)
+            if len(_fingerprint_ids) > MAX_FINGERPRINTS:
+                _fingerprint_ids.popitem(last=False)
+        else:
+            _fingerprint_ids.move_to_end(key)
+        return fingerprint
+
 
 class Node(QObject, Serializable):
 
@@ -9,6 +40,22 @@ class Node(QObject, Serializable):
     new_results = Signal()
     new_inputs = Signal(object)
 
+    # False for nodes whose results do not only depend on their inputs (randomness, file system)
+    cacheable: bool = True
+    # True for nodes that hold the GIL for long or share state, the executor never runs them on its
+    # worker threads
+    keep_serial: bool = False
+    # parameters measured in pixels, by index, with the power they scale with (2 for areas); they
+    # are scaled by Graph.pixel_scale so that results on proxy frames stay comparable
+    pixel_params: dict[int, int] = {}
+    # image parameters of pixelwise nodes, whose first result at a pixel only depends on these
+    # images at the same pixel; the executor fuses chains of such nodes, see tile_function
+    image_params: tuple[int, ...] = ()
+    # results compared with their previous value after every computation, e.g. masks that often
+    # stay the same between frames; while they are equal their fingerprints do not change and
+    # downstream nodes reuse their results instead of recomputing
+    compare_results: tuple[int, ...] = ()
+
     def __init__(self, graph: "Graph", parameter_template: list[tuple[str, type[IOType]]] = [], result_template:
                  list[tuple[str, type[IOType]]] = []):
         super().__init__()
@@ -24,11 +71,58 @@ class Node(QObject, Serializable):
         self.default_values: list[Optional[IOType]] = [None for _ in self.parameter_template]
         self.min_values: list[Optional[IOType]] = [None for _ in self.parameter_template]
         self.max_values: list[Optional[IOType]] = [None for _ in self.parameter_template]
+        # frame the node is evaluated for, None means the current frame of the source manager
+        self.frame_idx: Optional[int] = None
+        # identifies the current results, equal fingerprints mean equal results
+        self.fingerprint: Optional[int] = None
+        # per result the fingerprint seen by downstream cache keys: the value of scalars, a
+        # version for compare_results, otherwise derived from the fingerprint
+        self.result_fingerprints: list[Optional[int]] = [None for _ in self.result_template]
+        self._id = next(_node_ids)
+        self._versions: list[int] = [0 for _ in self.result_template]
+        self._compared: list[Any] = [None for _ in self.result_template]
+        # key and results of the last computation, reused while the key does not change
+        self._last_key: Optional[Hashable] = None
+        self._last_results: Optional[list[Any]] = None
+        # indices of the results that are read downstream or shown, None for all; nodes may leave
+        # the other results empty, see result_wanted
+        self.wanted_results: Optional[set[int]] = None
+        # timings of compute_cached, see Graph.get_profiles
+        self.profile = NodeProfile()
 
 
     def compute_function(self, inputs: list[Any]) -> list[Any]:
         return self.results
 
+    def output_buffer(self, *images) -> Any:
+        """Array from the buffer pool of the graph for a result with the shape and type of the
+        images, to be passed as dst or out. None without a pool or for images of different shape
+        or type, OpenCV and NumPy then allocate the result."""
+        pool = self.graph.buffer_pool
+        if pool is None or any(image.shape != images[0].shape or image.dtype != images[0].dtype
+                               for image in images[1:]):
+            return None
+        return pool.empty(images[0].shape, images[0].dtype)
+
+    def proxy_mode(self) -> bool:
+        """True while the graph is evaluated on reduced resolution proxy frames. Nodes writing files
+        refuse to run then, exports are always made at full resolution."""
+        return self.graph.pixel_scale < 1
+
+    def result_wanted(self, idx: int) -> bool:
+        """False if nobody reads the result, compute_function can then skip computing it."""
+        return self.wanted_results is None or idx in self.wanted_results
+
+    def tile_function(self, inputs: list[Optional[IOType]], dtype) -> Optional[Callable[..., Any]]:
+        """For pixelwise nodes: function computing the first result for row tiles of the image
+        parameters, in the order of image_params. The image parameters in inputs may be empty.
+        None if the node cannot be fused for these inputs."""
+        return None
+
+    def fused_results(self, inputs: list[Optional[IOType]], image: Any, dtype) -> list[Any]:
+        """Results of a fused pixelwise node, image is None if the node was not materialized."""
+        return [self.result_template[0][1](value=image)]
+
     @Slot()
     def on_new_data(self):
         self.results = [None for _ in self.result_template]
@@ -48,17 +142,143 @@ class Node(QObject, Serializable):
                 break
         return self.results
 
-    def compute(self):
-        # get inputs:
-        inputs = self.graph.get_params(self)
+    def fill_inputs(self, inputs: list[Optional[IOType]]) -> list[Optional[IOType]]:
+        """Replace unconnected inputs by the external input or the default value."""
+        inputs = list(inputs)
         for i in range(len(inputs)):
             if inputs[i] is None:
                 inputs[i] = self.external_inputs[i]
             if inputs[i] is None:
                 inputs[i] = self.default_values[i]
+        return inputs
+
+    def scale_pixel_params(self, inputs: list[Optional[IOType]]) -> list[Optional[IOType]]:
+        """Scale the positive pixel parameters to the resolution of the frames. Integer sizes stay
+        at least 1, negative values usually have a special meaning and are kept."""
+        scale = self.graph.pixel_scale
+        if scale == 1 or not self.pixel_params:
+            return inputs
+        inputs = list(inputs)
+        for idx, power in self.pixel_params.items():
+            data = inputs[idx]
+            if data is None or not isinstance(data.value, (int, float)) or data.value <= 0:
+                continue
+            value = data.value * scale**power
+            if isinstance(data.value, int):
+                value = max(1, round(value))
+            inputs[idx] = type(data)(value=value)
+        return inputs
+
+    def cache_key_extra(self) -> Hashable:
+        """State besides the inputs the results depend on, e.g. the frame index of a source."""
+        return None
+
+    def cache_key(self, inputs: list[Optional[IOType]],
+                  upstream: list[Optional[int]]) -> Optional[Hashable]:
+        """Key of the results for the given inputs: node type, parameters, fingerprints of the
+        connected upstream results and cache_key_extra. None if the results cannot be cached."""
+        if not self.cacheable:
+            return None
+        params = []
+        for data, fingerprint in zip(inputs, upstream):
+            if fingerprint is not None:
+                if fingerprint < 0:
+                    return None
+                params.append(fingerprint)
+            elif data is None:
+                params.append(None)
+            else:
+                params.append((type(data).__name__, data.value))
+        wanted = None if self.wanted_results is None else tuple(sorted(self.wanted_results))
+        key = (type(self).__name__, tuple(sorted(self.to_dict()["params"].items())), tuple(params),
+               self.cache_key_extra(), wanted)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def set_fingerprint(self, key: Optional[Hashable]):
+        if key is None:
+            self.fingerprint = next(_uncached_fingerprints)
+            self.result_fingerprints = [self.fingerprint for _ in self.result_template]
+        else:
+            self.fingerprint = intern_fingerprint(key)
+            self.result_fingerprints = [intern_fingerprint((self.fingerprint, idx))
+                                        for idx in range(len(self.result_template))]
+
+    def update_result_fingerprints(self, results: list[Any]):
+        """Fingerprint scalar results by value and compare_results by version, so that equal
+        results lead to equal downstream cache keys even if the inputs of this node changed."""
+        fingerprints = list(self.result_fingerprints)
+        for idx, data in enumerate(results):
+            if not isinstance(data, IOType):
+                continue
+            if data.value is None or isinstance(data.value, (bool, int, float, str)):
+                # the value itself, not its hash, floats as hex so that -0.0 and 0.0 differ
+                value = data.value.hex() if isinstance(data.value, float) else data.value
+                fingerprints[idx] = intern_fingerprint(("value", type(data).__name__,
+                                                        type(data.value).__name__, value))
+            elif idx in self.compare_results and self.graph.compare_results:
+                if not same_value(data, self._compared[idx]):
+                    self._versions[idx] += 1
+                    self._compared[idx] = data
+                fingerprints[idx] = intern_fingerprint(("version", self._id, idx, self._versions[idx]))
+        self.result_fingerprints = fingerprints
+
+    def lookup_results(self, key: Optional[Hashable]) -> Optional[list[Any]]:
+        """The last results if the key did not change, otherwise the results in the cache."""
+        if key is None:
+            return None
+        if key == self._last_key:
+            return self._last_results
+        results = RESULT_CACHE.get(key)
+        if results is not None:
+            self._last_key, self._last_results = key, results
+        return results
+
+    def store_results(self, key: Optional[Hashable], results: list[Any]):
+        if key is None:
+            return
+        self._last_key, self._last_results = key, results
+        # results drawn from a buffer pool are recycled and must not be kept by the cache
+        if self.graph.buffer_pool is None:
+            RESULT_CACHE.put(key, results)
+
+    def compute_cached(self, inputs: list[Optional[IOType]],
+                       upstream: list[Optional[int]]) -> list[Any]:
+        # the inputs shown to the user stay unscaled
+        start, start_cpu = perf_counter(), thread_time()
+        inputs = self.scale_pixel_params(inputs)
+        key = self.cache_key(inputs, upstream)
+        self.set_fingerprint(key)
+        results = self.lookup_results(key)
+        cache_hit = results is not None
+        if results is None:
+            results = self.compute_function(inputs)
+            self.store_results(key, results)
+        self.update_result_fingerprints(results)
+        self.profile.record(perf_counter() - start, thread_time() - start_cpu, cache_hit,
+                            get_nbytes(results))
+        return results
+
+    def evaluate(self, inputs: list[Optional[IOType]], frame_idx: Optional[int] = None,
+                 upstream: Optional[list[Optional[int]]] = None) -> list[Any]:
+        """Compute the results for already collected inputs without emitting any signal."""
+        self.frame_idx = frame_idx
+        if upstream is None:
+            upstream = self.graph.get_input_fingerprints(self)
+        self.results = self.compute_cached(self.fill_inputs(inputs), upstream)
+        return self.results
+
+    def compute(self):
+        # get inputs:
+        self.frame_idx = None
+        inputs = self.fill_inputs(self.graph.get_params(self))
+        upstream = self.graph.get_input_fingerprints(self)
 
         self.new_inputs.emit(inputs)
-        self.results = self.compute_function(inputs)
+        self.results = self.compute_cached(inputs, upstream)
         # self.new_params.emit()
         self.new_results.emit()
 
@@ -77,6 +297,13 @@ class Graph(QObject):
         super().__init__()
 
         self.nodes: list[Node] = []
+        # resolution of the frames relative to the source, below 1 in proxy mode
+        self.pixel_scale: float = 1.0
+        # set by the executor to recycle result arrays between frames, see Node.output_buffer
+        self.buffer_pool: Optional[BufferPool] = None
+        # whether Node.compare_results are compared, turned off by the executor unless requested
+        # because comparing full frames costs more than it saves in most headless runs
+        self.compare_results: bool = True
         self.connections: dict[Node, list[Optional[tuple[Node, int]]]] = {} # Node: [(Node, idx), (Node, idx), ...]
 
     def add_node(self, node: Node):
@@ -118,5 +345,23 @@ class Graph(QObject):
                 inputs.append(None)
         return inputs
 
+    def get_profiles(self) -> dict[Node, NodeProfile]:
+        return {node: node.profile for node in self.nodes}
+
+    def reset_profiles(self):
+        for node in self.nodes:
+            node.profile.reset()
+
+    def get_input_fingerprints(self, node: Node) -> list[Optional[int]]:
+        """Fingerprints of the connected upstream results, None if unconnected."""
+        fingerprints: list[Optional[int]] = []
+        for connection in self.connections.get(node, [None for _ in node.parameter_template]):
+            if connection is None:
+                fingerprints.append(None)
+            else:
+                connected_node, connected_idx = connection
+                fingerprints.append(connected_node.result_fingerprints[connected_idx])
+        return fingerprints
+
     # def to_dict(self):
 
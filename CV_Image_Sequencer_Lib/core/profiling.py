@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Iterable
+
+
+class NodeProfile:
+    """Timings of the computations of a node, times in seconds. A call answered from the last
+    results or the result cache counts as cache hit. The CPU time is that of the calling thread,
+    threads started by OpenCV are not included."""
+
+    def __init__(self, window: int = 30):
+        self.calls: int = 0
+        self.cache_hits: int = 0
+        self.wall_time: float = 0.0
+        self.cpu_time: float = 0.0
+        # size of the results of the last call
+        self.output_bytes: int = 0
+        self.last_wall_time: float = 0.0
+        # wall times of the last calls for the rolling average
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def record(self, wall_time: float, cpu_time: float, cache_hit: bool, output_bytes: int):
+        self.calls += 1
+        self.cache_hits += cache_hit
+        self.wall_time += wall_time
+        self.cpu_time += cpu_time
+        self.output_bytes = output_bytes
+        self.last_wall_time = wall_time
+        self.recent.append(wall_time)
+
+    @property
+    def mean_wall_time(self) -> float:
+        """Rolling average over the last calls."""
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def reset(self):
+        self.calls = self.cache_hits = self.output_bytes = 0
+        self.wall_time = self.cpu_time = self.last_wall_time = 0.0
+        self.recent.clear()
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "cache_hits": self.cache_hits, "wall_time": self.wall_time,
+                "cpu_time": self.cpu_time, "output_bytes": self.output_bytes,
+                "last_wall_time": self.last_wall_time, "mean_wall_time": self.mean_wall_time}
+
+
+def format_profiles(profiles: Iterable[tuple[str, NodeProfile]]) -> str:
+    """Table of the profiles by name, the slowest node in total first."""
+    rows = sorted(profiles, key=lambda item: item[1].wall_time, reverse=True)
+    total = sum(profile.wall_time for _, profile in rows) or 1.0
+    width = max([len(name) for name, _ in rows] + [4])
+    lines = [f"{'node':<{width}} {'calls':>7} {'hits':>7} {'wall ms':>10} {'cpu ms':>10} "
+             f"{'ms/call':>8} {'share':>6} {'out MiB':>8}"]
+    for name, profile in rows:
+        per_call = profile.wall_time / profile.calls if profile.calls else 0.0
+        lines.append(f"{name:<{width}} {profile.calls:>7} {profile.cache_hits:>7} "
+                     f"{profile.wall_time * 1000:>10.1f} {profile.cpu_time * 1000:>10.1f} "
+                     f"{per_call * 1000:>8.2f} {profile.wall_time / total:>6.1%} "
+                     f"{profile.output_bytes / 2**20:>8.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+from collections import deque
+from typing import Callable, Optional
+import numpy as np
+
+
+class SlidingWindowExtremum:
+    """Per pixel minimum or maximum of the last `window` pushed frames (van Herk/Gil-Werman).
+
+    Frames are grouped into blocks of `window` frames. A window covers the end of the previous
+    block, whose suffix extrema are computed once when the block is complete, and the start of the
+    current block, whose prefix extremum is kept up to date. A push therefore costs a constant
+    number of frame operations independent of the window size. Blocks are counted from the first
+    push, so pushes have to start at a multiple of `window` for windows aligned to frame indices."""
+
+    def __init__(self, window: int, op: Callable[[np.ndarray, np.ndarray], np.ndarray]):
+        self.window: int = max(1, window)
+        # np.minimum or np.maximum
+        self.op = op
+
+        self.block: list[np.ndarray] = []
+        self.prefix: Optional[np.ndarray] = None
+        self.suffix: list[np.ndarray] = []
+
+    def push(self, frame: np.ndarray) -> np.ndarray:
+        """Add the next frame and return the extremum of the window ending with it. The returned
+        array is not modified by later pushes."""
+        if len(self.block) == self.window:
+            suffix = [self.block[-1]]
+            for block_frame in reversed(self.block[:-1]):
+                suffix.append(self.op(block_frame, suffix[-1]))
+            suffix.reverse()
+            self.suffix = suffix
+            self.block = []
+
+        pos = len(self.block)
+        self.block.append(frame)
+        self.prefix = frame if pos == 0 else self.op(self.prefix, frame)
+        if pos == self.window - 1 or not self.suffix:
+            return self.prefix
+        return self.op(self.suffix[pos + 1], self.prefix)
+
+    def reset(self):
+        self.block = []
+        self.prefix = None
+        self.suffix = []
+
+
+class SlidingWindowPercentile:
+    """Per pixel percentile of the last `window` pushed uint8 frames, equal to
+    np.percentile(frames, q, axis=0, method="lower").
+
+    Every pixel keeps a histogram of its values in the window, its current percentile value and
+    the number of window values below it. A push updates two histogram bins per pixel and moves
+    each percentile value by as many bins as it changes, which is a few bins for a background."""
+
+    def __init__(self, window: int):
+        self.window: int = max(1, window)
+
+        self.frames: deque[np.ndarray] = deque()
+        # flat (pixels * 256) histograms, the bin of value v of pixel p is at p * 256 + v
+        self.counts: Optional[np.ndarray] = None
+        self.pixels: Optional[np.ndarray] = None
+        self.value: Optional[np.ndarray] = None
+        self.below: Optional[np.ndarray] = None
+        self.shape: tuple = ()
+
+    def reset(self):
+        self.frames.clear()
+        self.counts = None
+
+    def push(self, frame: np.ndarray, percentile: float) -> np.ndarray:
+        """Add the next frame and return the percentile (0 to 100) of the window ending with it."""
+        if frame.dtype != np.uint8:
+            raise ValueError("Rolling percentiles are only supported for uint8 frames")
+        values = frame.ravel()
+        if self.counts is None or self.value.size != values.size:
+            self.frames.clear()
+            self.counts = np.zeros(values.size * 256, np.uint8 if self.window < 256 else np.uint16)
+            index_type = np.int32 if values.size * 256 < 2**31 else np.int64
+            self.pixels = np.arange(values.size, dtype=index_type)
+            self.value = np.zeros(values.size, index_type)
+            self.below = np.zeros(values.size, np.int32)
+
+        self.counts[self._bins(values)] += 1
+        self.below += values < self.value
+        self.frames.append(values)
+        self.shape = frame.shape
+        if len(self.frames) > self.window:
+            old = self.frames.popleft()
+            self.counts[self._bins(old)] -= 1
+            self.below -= old < self.value
+
+        return self.percentile(percentile)
+
+    def percentile(self, percentile: float) -> np.ndarray:
+        """The percentile of the current window, another percentile only moves the values."""
+        rank = int(min(max(percentile, 0.0), 100.0) / 100 * (len(self.frames) - 1))
+        self._move_to_rank(rank)
+        return self.value.astype(np.uint8).reshape(self.shape)
+
+    def _bins(self, values: np.ndarray, pixels: Optional[np.ndarray] = None) -> np.ndarray:
+        if pixels is None:
+            pixels = self.pixels
+        return pixels * 256 + values
+
+    def _move_to_rank(self, rank: int):
+        """Move every value to the smallest bin with more than `rank` window values at or below it."""
+        active = np.flatnonzero(self.below > rank)
+        while active.size:
+            self.value[active] -= 1
+            self.below[active] -= self.counts[self._bins(self.value[active], active)]
+            active = active[self.below[active] > rank]
+
+        active = self.pixels
+        while active.size:
+            count = self.counts[self._bins(self.value[active], active)]
+            move = self.below[active] + count <= rank
+            active = active[move]
+            self.below[active] += count[move]
+            self.value[active] += 1
@@ -0,0 +1,157 @@
+import multiprocessing as mp
+import os
+import traceback
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Iterator, Optional
+import numpy as np
+
+from ..utils.source_manager import SourceManager
+from .executor import GraphExecutor
+from .types import IOType
+
+
+@dataclass
+class SharedArray:
+    """Picklable handle of an array result that was copied into shared memory."""
+    name: str
+    shape: tuple
+    dtype: str
+    io_type: type[IOType]
+
+
+def to_shared(value: Any) -> Any:
+    if not isinstance(value, IOType) or not isinstance(value.value, np.ndarray) or value.value.nbytes == 0:
+        return value
+    shm = shared_memory.SharedMemory(create=True, size=value.value.nbytes)
+    array = np.ndarray(value.value.shape, value.value.dtype, buffer=shm.buf)
+    array[...] = value.value
+    handle = SharedArray(shm.name, value.value.shape, value.value.dtype.str, type(value))
+    del array
+    shm.close()
+    return handle
+
+
+def from_shared(value: Any) -> Any:
+    """Copy a SharedArray back into a regular IOType and free the shared memory."""
+    if not isinstance(value, SharedArray):
+        return value
+    shm = shared_memory.SharedMemory(name=value.name)
+    array = np.ndarray(value.shape, np.dtype(value.dtype), buffer=shm.buf).copy()
+    shm.close()
+    shm.unlink()
+    return value.io_type(array)
+
+
+def load_source(source_manager: SourceManager, source_path: str):
+    source_manager.loop_mode = False
+    source_manager.load_source(source_path)
+
+
+def _shard_worker(worker_idx: int, workflow_path: str, source_path: str,
+                  outputs: Optional[list[tuple[str, int]]], options: dict, tasks: mp.Queue,
+                  results: mp.Queue, slots):
+    try:
+        source_manager = SourceManager(options["decode_workers"])
+        load_source(source_manager, source_path)
+        executor = GraphExecutor.from_file(workflow_path, source_manager, options["n_workers"],
+                                           options["fuse"], options["recycle_buffers"],
+                                           options["compare_results"])
+        if outputs is None:
+            outputs = executor.get_sink_outputs()
+        executor.set_outputs(outputs)
+
+        while (task := tasks.get()) is not None:
+            start, stop = task
+            if options["n_stages"] > 1:
+                frames = executor.run_pipelined(start, stop, options["n_stages"])
+            else:
+                frames = executor.run(start, stop)
+            for frame_idx, frame_results in frames:
+                values = {}
+                for uuid, idx in outputs:
+                    values[(uuid, idx)] = to_shared(executor.get_node_results(frame_results, uuid)[idx])
+                # wait until the frame is among the frames in flight this worker may have
+                slots.acquire()
+                results.put(("frame", worker_idx, frame_idx, values))
+    except Exception:
+        results.put(("error", worker_idx, -1, traceback.format_exc()))
+    results.put(("done", worker_idx, -1, None))
+
+
+def split_shards(start: int, stop: int, n_shards: int) -> list[tuple[int, int]]:
+    n_shards = max(1, min(n_shards, stop - start))
+    bounds = np.linspace(start, stop, n_shards + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def run_sharded(workflow_path: str, source_path: str, start: int = 0, stop: Optional[int] = None,
+                n_processes: Optional[int] = None, shard_size: int = 500,
+                outputs: Optional[list[tuple[str, int]]] = None, max_in_flight: int = 16,
+                n_workers: int = 1, n_stages: int = 1, fuse: bool = True,
+                recycle_buffers: bool = True, compare_results: bool = False,
+                decode_workers: Optional[int] = None) -> Iterator[tuple[int, dict]]:
+    """Process a frame range with n_processes worker processes, each running the workflow on
+    shards of at most shard_size frames. Array results are handed back through shared memory.
+    Yields (frame_idx, {(node uuid, result idx): value}) in frame order, by default for all
+    results that are not consumed by another node.
+
+    A worker waits once max_in_flight of its frames are not yet yielded, so that a worker ahead
+    of a slower one does not pile up results. The remaining arguments configure the executor and
+    source manager of every worker."""
+    if n_processes is None:
+        n_processes = os.cpu_count() or 1
+    if stop is None:
+        source_manager = SourceManager()
+        load_source(source_manager, source_path)
+        stop = source_manager.get_number_of_frames()
+
+    shards = split_shards(start, stop, max(n_processes, -(-(stop - start) // shard_size)))
+    ctx = mp.get_context("spawn")
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    for shard in shards:
+        tasks.put(shard)
+    n_processes = min(n_processes, len(shards))
+    for _ in range(n_processes):
+        tasks.put(None)
+
+    options = {"n_workers": n_workers, "n_stages": n_stages, "fuse": fuse,
+               "recycle_buffers": recycle_buffers, "compare_results": compare_results,
+               "decode_workers": decode_workers}
+    slots = [ctx.Semaphore(max(1, max_in_flight)) for _ in range(n_processes)]
+    processes = [ctx.Process(target=_shard_worker, args=(i, workflow_path, source_path, outputs,
+                                                         options, tasks, results, slots[i]),
+                             daemon=True)
+                 for i in range(n_processes)]
+    for process in processes:
+        process.start()
+
+    # by frame index the worker and the results
+    pending: dict[int, tuple[int, dict]] = {}
+    next_frame = start
+    n_running = n_processes
+    try:
+        while n_running > 0:
+            kind, worker_idx, frame_idx, data = results.get()
+            if kind == "done":
+                n_running -= 1
+            elif kind == "error":
+                raise RuntimeError(f"Shard worker failed:\n{data}")
+            else:
+                pending[frame_idx] = (worker_idx, {key: from_shared(value) for key, value in data.items()})
+                while next_frame in pending:
+                    worker_idx, values = pending.pop(next_frame)
+                    slots[worker_idx].release()
+                    yield next_frame, values
+                    next_frame += 1
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+        # free shared memory of results that were not collected
+        while not results.empty():
+            kind, _, _, data = results.get()
+            if kind == "frame":
+                for value in data.values():
+                    from_shared(value)
@@ -1,6 +1,7 @@
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import QApplication, QHBoxLayout, QWidget, QTabWidget
 from importlib import reload
+import os
 import sys
 
 from .tab_widget import TabWidget
@@ -17,7 +18,10 @@ class CVImageSequencerWidget(QWidget):
         app.aboutToQuit.connect(self.on_quit)
 
         self.init_ui()
-        self.source_manager.load_directory("/Users/vdausmann/data/20241106-1526_SO308_1-5-1_PISCO2_png/selection")
+        # the directory is indexed in the background, a large directory must not block the window
+        path = "/Users/vdausmann/data/20241106-1526_SO308_1-5-1_PISCO2_png/selection"
+        if os.path.isdir(path):
+            self.source_manager.load_directory_async(path)
 
     def init_ui(self):
         self.main_layout = QHBoxLayout(self)
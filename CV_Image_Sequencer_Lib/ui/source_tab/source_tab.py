@@ -1,4 +1,5 @@
-from PySide6.QtWidgets import QHBoxLayout, QInputDialog, QWidget, QLabel, QVBoxLayout, QFileDialog
+from PySide6.QtWidgets import (QCheckBox, QHBoxLayout, QInputDialog, QSpinBox, QWidget, QLabel,
+                               QVBoxLayout, QFileDialog)
 from PySide6.QtGui import QPixmap
 from PySide6.QtCore import QSize, Qt, Signal, Slot
 
@@ -6,6 +7,7 @@ from ...core.types import ColorImage
 
 from ...assets.styles.style import STYLE
 from ...utils.source_manager import SourceManager, convert_cv_to_qt
+from ...utils.watch_folder import WATCH_CATCH_UP, WATCH_LATEST
 from ..styled_widgets import StyledButton
 
 class SourcePlayerTab(QWidget):
@@ -28,8 +30,15 @@ class SourcePlayerTab(QWidget):
     def init_ui(self):
         layout = QVBoxLayout(self)
 
+        info_row = QWidget()
+        info_row_layout = QHBoxLayout(info_row)
+        info_row_layout.setContentsMargins(0, 0, 0, 0)
         self.frame_number_label = QLabel("Frame: ")
-        layout.addWidget(self.frame_number_label, 1)
+        self.fps_label = QLabel("")
+        self.fps_label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        info_row_layout.addWidget(self.frame_number_label)
+        info_row_layout.addWidget(self.fps_label)
+        layout.addWidget(info_row, 1)
 
         self.video_frame_label = QLabel("Source")
         self.video_frame_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -74,12 +83,22 @@ class SourcePlayerTab(QWidget):
         self.skip_next_button.setIconSize(QSize(28, 28))
         self.skip_next_button.clicked.connect(lambda: self.source_manager.get_frame(5))
 
+        # in real time mode frames are skipped if the workflow cannot keep up with the target fps
+        self.realtime_checkbox = QCheckBox("Real-time")
+        self.realtime_checkbox.setChecked(True)
+        self.fps_spinbox = QSpinBox()
+        self.fps_spinbox.setRange(1, 240)
+        self.fps_spinbox.setValue(60)
+        self.fps_spinbox.setSuffix(" fps")
+
         button_row_layout.addWidget(self.open_file, alignment=Qt.AlignmentFlag.AlignLeft)
         button_row_layout.addWidget(self.skip_previous_button)
         button_row_layout.addWidget(self.previous_frame_button)
         button_row_layout.addWidget(self.start_stop_button)
         button_row_layout.addWidget(self.next_frame_button)
         button_row_layout.addWidget(self.skip_next_button)
+        button_row_layout.addWidget(self.realtime_checkbox)
+        button_row_layout.addWidget(self.fps_spinbox)
 
         layout.addWidget(button_row, 1)
 
@@ -89,13 +108,19 @@ class SourcePlayerTab(QWidget):
             self.source_manager.stop()
         else:
             self.start_stop_button.setIcon(self.start_stop_button.icons[1])
-            self.source_manager.start(1000 // 60)
+            if self.realtime_checkbox.isChecked():
+                self.source_manager.start_realtime(self.fps_spinbox.value())
+            else:
+                self.source_manager.start(1000 // self.fps_spinbox.value())
 
         self.playing_video = not self.playing_video
         self.skip_next_button.setDisabled(self.playing_video)
         self.skip_previous_button.setDisabled(self.playing_video)
         self.next_frame_button.setDisabled(self.playing_video)
         self.previous_frame_button.setDisabled(self.playing_video)
+        self.realtime_checkbox.setDisabled(self.playing_video)
+        self.fps_spinbox.setDisabled(self.playing_video)
+        self.fps_label.setText("")
 
 
     @Slot(ColorImage)
@@ -108,7 +133,18 @@ class SourcePlayerTab(QWidget):
         pixmap_scaled = pixmap.scaled(self.img_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
         self.video_frame_label.setPixmap(pixmap_scaled)
 
-        self.frame_number_label.setText(f"Frame: {self.source_manager.current_frame_idx}")
+        text = f"Frame: {self.source_manager.current_frame_idx}"
+        if self.source_manager.proxy_scale > 1:
+            text += f" [proxy 1/{self.source_manager.proxy_scale}]"
+        if self.source_manager.folder_watcher is not None:
+            text += (f" (live, backlog: {len(self.source_manager.watch_backlog)}, "
+                     f"dropped: {self.source_manager.frames_dropped})")
+        self.frame_number_label.setText(text)
+
+        if self.source_manager.realtime_playing:
+            self.fps_label.setText(f"Target: {self.source_manager.target_fps:.0f} fps, "
+                                   f"achieved: {self.source_manager.get_achieved_fps():.1f} fps, "
+                                   f"skipped: {self.source_manager.frames_skipped}")
 
     def resizeEvent(self, event) -> None:
         ret = super().resizeEvent(event)
@@ -116,7 +152,7 @@ class SourcePlayerTab(QWidget):
         return ret
 
     def open_source_dialog(self):
-        mode, ok = QInputDialog.getItem(None, "Select Mode", "Source type:", ["Video", "Image Directory"], 0, False)
+        mode, ok = QInputDialog.getItem(None, "Select Mode", "Source type:", ["Video", "Image Directory", "Watch Directory", "Frame Store", "HDF5 File", "Multi-page TIFF"], 0, False)
         if not ok:
             return
 
@@ -124,6 +160,48 @@ class SourcePlayerTab(QWidget):
             file_paths = QFileDialog.getOpenFileName(caption="Select Video File", filter="Video Files (*.mp4 *.avi *.mov);;All Files (*)")
             if file_paths:
                 self.source_manager.load_video(file_paths[0])
+        elif mode == "HDF5 File":
+            path = QFileDialog.getOpenFileName(caption="Select HDF5 File", filter="HDF5 Files (*.h5 *.hdf5 *.he5);;All Files (*)")[0]
+            if path:
+                self.open_hdf5(path)
+        elif mode == "Watch Directory":
+            path = QFileDialog.getExistingDirectory(None, "Select Directory to Watch")
+            if not path:
+                return
+            policies = {"Process every frame": WATCH_CATCH_UP, "Process newest frame only": WATCH_LATEST}
+            policy, ok = QInputDialog.getItem(None, "Select Policy", "Frames arriving faster than processed:",
+                                              list(policies), 0, False)
+            if ok:
+                self.source_manager.watch_directory(path, policies[policy])
+        elif mode == "Multi-page TIFF":
+            path = QFileDialog.getOpenFileName(caption="Select TIFF File", filter="TIFF Files (*.tif *.tiff);;All Files (*)")[0]
+            if path:
+                self.source_manager.load_tiff(path)
+        elif mode == "Frame Store":
+            path = QFileDialog.getExistingDirectory(None, "Select Frame Store")
+            if path:
+                self.source_manager.load_store(path)
         else:
             path = QFileDialog.getExistingDirectory(None, "Select Image Directory")
-            self.source_manager.load_directory(path)
+            if path:
+                self.source_manager.load_directory_async(path)
+
+    def open_hdf5(self, path: str):
+        try:
+            import h5py
+            from ...utils.frame_store import list_frame_datasets
+        except ImportError:
+            print("ERROR: h5py package not found. Please install it.")
+            return
+
+        with h5py.File(path, "r") as f:
+            datasets = list_frame_datasets(f)
+        if not datasets:
+            print(f"No frame dataset found in {path}")
+            return
+        dataset = datasets[0]
+        if len(datasets) > 1:
+            dataset, ok = QInputDialog.getItem(None, "Select Dataset", "Dataset:", datasets, 0, False)
+            if not ok:
+                return
+        self.source_manager.load_hdf5(path, dataset)
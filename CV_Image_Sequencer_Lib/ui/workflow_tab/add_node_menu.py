@@ -6,7 +6,8 @@ from PySide6.QtWidgets import (
 )
 
 from ...core.custom_nodes import (DilateNode, ErodeNode, MaxNode, MinNode, MorphologyOperationNode, PixelwiseAnd, RegionOfInterestNode, SourceNode, ABSDiffNode, SplitChannelNode,
-                                  ThresholdNode, InvertNode, ClampedDiffNode, FindContoursNode, SaveContourCropsNode, ClassificationNode, DeconvolutionNode)  # Add ClassificationNode
+                                  ThresholdNode, InvertNode, ClampedDiffNode, FindContoursNode, SaveContourCropsNode, ClassificationNode, DeconvolutionNode,
+                                  RollingMinMaxBackgroundNode, RollingPercentileBackgroundNode)  # Add ClassificationNode
 
 
 class AddNodeMenu(QMenu):
@@ -65,6 +66,14 @@ class AddNodeMenu(QMenu):
         self._actions[action] = PixelwiseAnd
         menu_pxwise.addAction(action)
 
+        menu_background = menu_1C.addMenu("Background models")
+        action = QAction("Rolling Min/Max", self)
+        self._actions[action] = RollingMinMaxBackgroundNode
+        menu_background.addAction(action)
+        action = QAction("Rolling Median/Percentile", self)
+        self._actions[action] = RollingPercentileBackgroundNode
+        menu_background.addAction(action)
+
         action = QAction("Threshold", self)
         self._actions[action] = ThresholdNode
         menu_1C.addAction(action)
@@ -112,5 +121,10 @@ class AddNodeMenu(QMenu):
                 #     return GrayScaleSourceNode, params
             else:
                 return None, {}
+        if self._actions[res] in (RollingMinMaxBackgroundNode, RollingPercentileBackgroundNode):
+            value, ok = QInputDialog.getInt(None, "Set window size", "Number of frames:", 20, 1, 500, 1)
+            if not ok:
+                return None, {}
+            return self._actions[res], {"window": value}
         return self._actions[res], {}
 
@@ -1,5 +1,5 @@
 from typing import Optional
-from PySide6.QtCore import QPointF, Signal, Slot
+from PySide6.QtCore import QPointF, QTimer, Signal, Slot
 from PySide6.QtGui import QPainter, Qt
 from PySide6.QtWidgets import QGraphicsScene, QGraphicsSceneMouseEvent, QGraphicsView, QVBoxLayout, QWidget
 
@@ -41,12 +41,19 @@ class GraphVis(QWidget):
         super().__init__()
         self.graph = Graph()
         self.source_manager = source_manager
+        self.graph.pixel_scale = 1 / self.source_manager.proxy_scale
+        self.source_manager.proxy_scale_changed.connect(self.on_proxy_scale_changed)
 
         self.node_visualizations: dict[Node, NodeVis] = {}  # node_uuid: NodeVis
         self.connections: dict[tuple[Node, int, Node, int], ConnectionVis] = {} 
         # descriptor for self.connections: (param_node, param_idx, result_node, result_idx): connection_vis
         self.node_vis_watching: Optional[NodeVis] = None
 
+        # refreshes the timing overlays of the nodes while they are shown
+        self.profile_timer = QTimer()
+        self.profile_timer.setInterval(250)
+        self.profile_timer.timeout.connect(self.update_profiles)
+
         self.init_ui()
         self.temp_connection: Optional[ConnectionVis] = None
 
@@ -66,8 +73,8 @@ class GraphVis(QWidget):
 
 
     def add_node(self, node_type: type[Node], add_to_graph: bool = True, x: float = 0, y: float = 0, **node_kwargs) -> Node:
-        if node_type == SourceNode:
-            node = SourceNode(self.graph, self.source_manager, **node_kwargs)
+        if issubclass(node_type, SourceNode):
+            node = node_type(self.graph, self.source_manager, **node_kwargs)
             self.source_manager.frame_ready.connect(lambda _: node.on_new_data())
         else:
             node = node_type(self.graph, **node_kwargs)
@@ -77,6 +84,7 @@ class GraphVis(QWidget):
         node_vis.double_clicked.connect(self.on_node_vis_double_click)
 
         node_vis.setPos(x, y)
+        node_vis.set_profile_visible(self.profile_timer.isActive())
         if add_to_graph:
             self.graph.add_node(node)
 
@@ -89,6 +97,27 @@ class GraphVis(QWidget):
         node.compute()
         return node
 
+    def set_profiles_visible(self, on: bool):
+        for node_vis in self.node_visualizations.values():
+            node_vis.set_profile_visible(on)
+        if on:
+            self.graph.reset_profiles()
+            self.update_profiles()
+            self.profile_timer.start()
+        else:
+            self.profile_timer.stop()
+
+    @Slot()
+    def update_profiles(self):
+        frame_time = sum(node.profile.last_wall_time for node in self.node_visualizations)
+        for node_vis in self.node_visualizations.values():
+            node_vis.update_profile(frame_time)
+
+    @Slot(int)
+    def on_proxy_scale_changed(self, scale: int):
+        # the nodes are recomputed when the source manager emits the current frame at the new scale
+        self.graph.pixel_scale = 1 / scale
+
     @Slot()
     def delete_node(self):
         sender = self.sender()
@@ -2,7 +2,7 @@ from typing import Any
 from uuid import UUID
 from PySide6.QtCore import QObject, Qt, Signal, Slot
 from PySide6.QtWidgets import (QWidget, QGraphicsRectItem, QHBoxLayout, QLabel,
-                               QGraphicsItem, QGraphicsProxyWidget)
+                               QGraphicsItem, QGraphicsProxyWidget, QGraphicsSimpleTextItem)
 from PySide6.QtGui import QColor, QBrush, QPen
 
 from .socket_vis import SocketVis
@@ -132,6 +132,11 @@ class NodeVis(QObject, QGraphicsRectItem):
         self.inspect_proxy.setPos(self.rect().width() - 22, self.rect().height() - 22)
         self.inspect_proxy.setVisible(False)
 
+        # timings of the node above its top bar, see update_profile
+        self.profile_text = QGraphicsSimpleTextItem(self)
+        self.profile_text.setPos(2, -18)
+        self.profile_text.setVisible(False)
+
     @Slot(list)
     def update_inputs(self, data: list):
         for idx, socket_vis in enumerate(self.input_sockets):
@@ -140,6 +145,22 @@ class NodeVis(QObject, QGraphicsRectItem):
     def set_inspect_icon(self, on: bool):
         self.inspect_proxy.setVisible(on)
 
+    def set_profile_visible(self, on: bool):
+        self.profile_text.setVisible(on)
+
+    def update_profile(self, frame_time: float):
+        """Show the last and the average time of the node, colored from the text color to red by
+        its share of frame_time, the time of all nodes for the last frame."""
+        profile = self.node.profile
+        share = profile.last_wall_time / frame_time if frame_time > 0 else 0.0
+        self.profile_text.setText(f"{profile.last_wall_time * 1000:.1f} ms  "
+                                  f"(avg {profile.mean_wall_time * 1000:.1f})  {share:.0%}")
+        low, high = QColor(STYLE["textcolor"]), QColor(STYLE["error"])
+        self.profile_text.setBrush(QBrush(QColor(
+            int(low.red() + share * (high.red() - low.red())),
+            int(low.green() + share * (high.green() - low.green())),
+            int(low.blue() + share * (high.blue() - low.blue())))))
+
     def show_help(self):
         dialog = HelpDialog(self.node.name + " Help", self.node.help_text)
         dialog.exec()
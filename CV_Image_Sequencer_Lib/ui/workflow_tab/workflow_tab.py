@@ -1,5 +1,5 @@
 from typing import Optional
-from PySide6.QtWidgets import QFileDialog, QInputDialog, QPushButton, QSplitter, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QScrollArea
+from PySide6.QtWidgets import QComboBox, QFileDialog, QInputDialog, QPushButton, QSplitter, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QScrollArea
 from PySide6.QtGui import QPixmap, QWheelEvent, QPainter, QPen, QMouseEvent
 from PySide6.QtCore import Qt, QSize, Slot, QRect, QPoint
 import numpy as np
@@ -11,7 +11,7 @@ from ...core.nodes import Node
 from ...core.custom_nodes import ABSDiffNode, SourceNode, ThresholdNode
 from .graph_vis import GraphVis
 from ...core.types import IOType, Serializable
-from ...utils.source_manager import SourceManager, convert_cv_to_qt
+from ...utils.source_manager import PROXY_SCALES, SourceManager, convert_cv_to_qt
 from ...assets.styles.style import STYLE
 
 
@@ -242,6 +242,7 @@ class WorkflowTabWidget(QWidget):
         self.graph_vis.new_results.connect(self.on_new_results)
         self.graph_vis.new_inputs.connect(self.on_new_inputs)
         self.graph_vis.new_node_viewing.connect(self.on_new_node)
+        self.source_manager.proxy_scale_changed.connect(self.on_proxy_scale_changed)
 
 
     def init_ui(self):
@@ -307,9 +308,38 @@ class WorkflowTabWidget(QWidget):
         load_button.clicked.connect(self.load_workflow)
         button_bar_layout.addWidget(load_button)
 
+        profile_button = QPushButton("Show timings")
+        profile_button.setCheckable(True)
+        profile_button.toggled.connect(self.graph_vis.set_profiles_visible)
+        button_bar_layout.addWidget(profile_button)
+
+        button_bar_layout.addStretch()
+        # proxy mode: frames are decoded at reduced resolution while editing, pixel parameters are
+        # scaled accordingly
+        self.resolution_label = QLabel()
+        button_bar_layout.addWidget(self.resolution_label)
+        self.resolution_box = QComboBox()
+        for scale in PROXY_SCALES:
+            self.resolution_box.addItem("Full resolution" if scale == 1 else f"Proxy 1/{scale}", scale)
+        self.resolution_box.setCurrentIndex(PROXY_SCALES.index(self.source_manager.proxy_scale))
+        self.resolution_box.currentIndexChanged.connect(
+            lambda i: self.source_manager.set_proxy_scale(self.resolution_box.itemData(i)))
+        button_bar_layout.addWidget(self.resolution_box)
+        self.on_proxy_scale_changed(self.source_manager.proxy_scale)
+
         main_layout.addStretch()
         main_layout.addWidget(button_bar)
 
+    @Slot(int)
+    def on_proxy_scale_changed(self, scale: int):
+        self.resolution_box.setCurrentIndex(PROXY_SCALES.index(scale))
+        if scale == 1:
+            self.resolution_label.setText("Full resolution")
+            self.resolution_label.setStyleSheet("")
+        else:
+            self.resolution_label.setText(f"PROXY 1/{scale}: pixel parameters are scaled")
+            self.resolution_label.setStyleSheet("color: #d08000; font-weight: bold;")
+
     def test(self):
         self.graph_vis.add_node(SourceNode, x=0, y=100, n_frames=3)
         self.graph_vis.add_node(SourceNode, x=0, y=300)
@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+INDEX_FILE = ".cvis_index.json.gz"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+_digits = re.compile(r"(\d+)")
+
+
+def natural_sort_key(name: str) -> list:
+    """Sort key that orders embedded numbers numerically, e.g. PISCO timestamps and frame numbers:
+    img_9.png < img_10.png."""
+    return [int(part) if part.isdigit() else part.lower() for part in _digits.split(name)]
+
+
+def is_image_file(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+@dataclass
+class DirectoryIndex:
+    """Naturally sorted image files of a directory with their modification times."""
+    files: list[str]
+    mtimes: list[float]
+    # modification time of the directory itself, changes when files are added or removed
+    dir_mtime: float
+
+    def save(self, directory: str):
+        with gzip.open(os.path.join(directory, INDEX_FILE), "wt") as f:
+            json.dump(asdict(self), f)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["DirectoryIndex"]:
+        try:
+            with gzip.open(os.path.join(directory, INDEX_FILE), "rt") as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def scan_directory(directory: str, previous: Optional[DirectoryIndex] = None) -> DirectoryIndex:
+    """Index the image files of the directory. The files are always stat'ed again, files rewritten
+    in place do not change the modification time of the directory, but only the order of added
+    files is computed anew. The previous index is returned as is if nothing changed."""
+    dir_mtime = os.stat(directory).st_mtime
+    mtimes: dict[str, float] = {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            if is_image_file(entry.name) and entry.is_file():
+                mtimes[entry.name] = entry.stat().st_mtime
+
+    if previous is None:
+        files = sorted(mtimes, key=natural_sort_key)
+    else:
+        files = [f for f in previous.files if f in mtimes]
+        known = set(files)
+        added = sorted((f for f in mtimes if f not in known), key=natural_sort_key)
+        # instrument output only appends, then the existing order can be kept
+        if files and added and natural_sort_key(added[0]) < natural_sort_key(files[-1]):
+            files = sorted(mtimes, key=natural_sort_key)
+        else:
+            files.extend(added)
+
+    index = DirectoryIndex(files, [mtimes[f] for f in files], dir_mtime)
+    if index == previous:
+        return previous
+    return index
+
+
+def load_directory_index(directory: str) -> DirectoryIndex:
+    """Return the index of the directory, reusing and updating the sidecar index file."""
+    previous = DirectoryIndex.load(directory)
+    index = scan_directory(directory, previous)
+    if index is not previous:
+        try:
+            index.save(directory)
+            # creating the index file itself modifies the directory
+            dir_mtime = os.stat(directory).st_mtime
+            if dir_mtime != index.dir_mtime:
+                index.dir_mtime = dir_mtime
+                index.save(directory)
+        except OSError as e:
+            print(f"Could not write directory index: {e}")
+    return index
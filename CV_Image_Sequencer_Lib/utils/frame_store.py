@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Optional
+import cv2 as cv
+import numpy as np
+
+from .directory_index import load_directory_index
+from .tiff import TiffPage, map_tiff_page, read_tiff_pages
+
+STORE_SUFFIX = ".cvis_store"
+STORE_INDEX = "index.json"
+# marks the index of a store written by convert_directory
+STORE_FORMAT = "cvis_npy_store"
+STORE_VERSION = 1
+CHUNK_NAME = "chunk_{:05d}.npy"
+# container.h5 or container.h5:/group/dataset
+_hdf5_path = re.compile(r"^(.*\.(?:h5|hdf5|he5))(?::(.+))?$", re.IGNORECASE)
+
+
+def to_mode(frame: np.ndarray, grayscale: bool) -> np.ndarray:
+    """Convert a stored frame to the requested mode. Frames already in that mode are returned
+    as is, without copying."""
+    if frame.ndim == 2:
+        return frame if grayscale else cv.cvtColor(frame, cv.COLOR_GRAY2BGR)
+    return cv.cvtColor(frame, cv.COLOR_BGR2GRAY) if grayscale else frame
+
+
+class FrameStore(ABC):
+    """Random access source of equally sized frames, e.g. a converted directory."""
+    n_frames: int = 0
+
+    @abstractmethod
+    def read(self, index: int) -> Optional[np.ndarray]:
+        """Return the frame as stored, preferably as read only view without copying. None if the
+        frame cannot be read."""
+
+    def reserve(self, n_frames: int):
+        """Windows of `n_frames` consecutive frames are going to be read."""
+        pass
+
+    def close(self):
+        pass
+
+
+def read_store_index(path: str) -> Optional[dict]:
+    """The index of the store in the directory, None if it does not hold a store of a supported
+    version."""
+    try:
+        with open(os.path.join(path, STORE_INDEX), "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("format") != STORE_FORMAT \
+            or index.get("version") != STORE_VERSION:
+        return None
+    return index
+
+
+def is_npy_frame_store(path: str) -> bool:
+    return read_store_index(path) is not None
+
+
+class NpyFrameStore(FrameStore):
+    """Frames packed into memory mapped .npy chunks of `chunk_size` frames, see convert_directory.
+    Frames are zero copy views into the page cache."""
+
+    def __init__(self, path: str):
+        index = read_store_index(path)
+        if index is None:
+            raise ValueError(f"Not a frame store: {path}")
+        self.index: dict = index
+        self.n_frames = self.index["n_frames"]
+        self.chunk_size: int = self.index["chunk_size"]
+        self.chunks: list[np.ndarray] = [np.load(os.path.join(path, name), mmap_mode="r")
+                                         for name in self.index["chunks"]]
+
+    def read(self, index: int) -> np.ndarray:
+        return np.asarray(self.chunks[index // self.chunk_size][index % self.chunk_size])
+
+    def close(self):
+        self.chunks = []
+
+
+def split_hdf5_path(path: str) -> Optional[tuple[str, Optional[str]]]:
+    """Split `container.h5:/group/dataset` into file and dataset path. None if the path does not
+    name an HDF5 file."""
+    match = _hdf5_path.match(path)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+def list_frame_datasets(h5_file) -> list[str]:
+    """Paths of all datasets in the open h5py file that look like frame stacks (n, h, w[, 3])."""
+    import h5py
+
+    datasets = []
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset) and (obj.ndim == 3 or (obj.ndim == 4 and obj.shape[3] == 3)):
+            datasets.append("/" + name)
+    h5_file.visititems(visit)
+    return datasets
+
+
+class Hdf5FrameStore(FrameStore):
+    """Frames of an (n, h, w[, 3]) dataset in an HDF5 file, by default the first such dataset.
+    Frames are read in blocks aligned to the chunks of the dataset along the frame axis and the
+    last blocks are kept, so windows of consecutive frames cost one read per chunk as long as
+    enough blocks are kept to cover the window, see reserve."""
+
+    def __init__(self, path: str, dataset: Optional[str] = None, block_size: int = 16,
+                 max_blocks: int = 2):
+        import h5py
+
+        self.file = h5py.File(path, "r")
+        if dataset is None:
+            datasets = list_frame_datasets(self.file)
+            if not datasets:
+                self.file.close()
+                raise ValueError(f"No frame dataset found in {path}")
+            dataset = datasets[0]
+        self.dataset = self.file[dataset]
+        self.n_frames = self.dataset.shape[0]
+        if self.dataset.chunks is not None:
+            block_size = self.dataset.chunks[0]
+        self.block_size: int = block_size
+        self.max_blocks: int = max_blocks
+
+        self.blocks: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._lock = Lock()
+
+    def read(self, index: int) -> np.ndarray:
+        start = index - index % self.block_size
+        with self._lock:
+            block = self.blocks.get(start)
+            if block is None:
+                block = self.dataset[start:start + self.block_size]
+                block.flags.writeable = False
+                self.blocks[start] = block
+                while len(self.blocks) > self.max_blocks:
+                    self.blocks.popitem(last=False)
+            else:
+                self.blocks.move_to_end(start)
+        return block[index - start]
+
+    def reserve(self, n_frames: int):
+        # a window that is not aligned to the blocks spans one block more
+        with self._lock:
+            self.max_blocks = max(self.max_blocks, -(-n_frames // self.block_size) + 1)
+
+    def close(self):
+        self.blocks.clear()
+        self.file.close()
+
+
+class TiffFrameStore(FrameStore):
+    """Pages of a multi page TIFF. Uncompressed pages are memory mapped and keep their bit depth,
+    other pages are decoded with cv.imreadmulti."""
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.pages: list[Optional[TiffPage]] = read_tiff_pages(path)
+        self.n_frames = len(self.pages)
+        self.buffer: Optional[np.memmap] = None
+        if any(page is not None for page in self.pages):
+            self.buffer = np.memmap(path, np.uint8, "r")
+
+    def read(self, index: int) -> Optional[np.ndarray]:
+        page = self.pages[index]
+        if page is not None:
+            return map_tiff_page(self.buffer, page)
+        ret, frames = cv.imreadmulti(self.path, index, 1, flags=cv.IMREAD_ANYDEPTH | cv.IMREAD_ANYCOLOR)
+        if not ret or not frames:
+            return None
+        return frames[0]
+
+    def close(self):
+        self.buffer = None
+
+
+def convert_directory(directory: str, store_path: Optional[str] = None, chunk_size: int = 1024,
+                      n_workers: Optional[int] = None) -> str:
+    """Decode all images of the directory once and pack them into a frame store. Images are
+    stored in grayscale if the first image is single channel, otherwise as BGR. Returns the path
+    of the store."""
+    if store_path is None:
+        store_path = directory.rstrip(os.sep) + STORE_SUFFIX
+    files = load_directory_index(directory).files
+    if not files:
+        raise ValueError("No valid image files could be found in the directory.")
+
+    first = cv.imread(os.path.join(directory, files[0]), cv.IMREAD_UNCHANGED)
+    if first is None:
+        raise ValueError(f"Could not read {files[0]}")
+    flags = cv.IMREAD_GRAYSCALE if first.ndim == 2 else cv.IMREAD_COLOR
+    shape = first.shape[:2] if first.ndim == 2 else first.shape[:2] + (3,)
+
+    def read(name: str) -> np.ndarray:
+        frame = cv.imread(os.path.join(directory, name), flags)
+        if frame is None or frame.shape != shape:
+            raise ValueError(f"Could not read {name} with shape {shape}")
+        return frame
+
+    os.makedirs(store_path, exist_ok=True)
+    chunks = []
+    with ThreadPoolExecutor(n_workers) as pool:
+        for start in range(0, len(files), chunk_size):
+            names = files[start:start + chunk_size]
+            chunks.append(CHUNK_NAME.format(len(chunks)))
+            chunk = np.lib.format.open_memmap(os.path.join(store_path, chunks[-1]), "w+", np.uint8,
+                                              (len(names),) + shape)
+            for i, frame in enumerate(pool.map(read, names)):
+                chunk[i] = frame
+            chunk.flush()
+            del chunk
+
+    # the index is written last, an interrupted conversion is not mistaken for a store
+    index = {"format": STORE_FORMAT, "version": STORE_VERSION, "n_frames": len(files),
+             "chunk_size": chunk_size, "shape": list(shape), "chunks": chunks, "files": files, "source": os.path.abspath(directory)}
+    with open(os.path.join(store_path, STORE_INDEX), "w") as f:
+        json.dump(index, f)
+    return store_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert an image directory into a frame store.")
+    parser.add_argument("directory", help="Image directory")
+    parser.add_argument("--output", default=None, help=f"Store path, defaults to <directory>{STORE_SUFFIX}")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Frames per chunk file")
+    parser.add_argument("--workers", type=int, default=None, help="Threads decoding the images")
+    args = parser.parse_args()
+
+    print(convert_directory(args.directory, args.output, args.chunk_size, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Optional
+from cv2.typing import MatLike
+
+
+class FramePrefetcher:
+    """Decodes the frames ahead of the current one on the decode pool. Frames that are no longer
+    ahead of the readers in play direction are dropped, the decode function is expected to keep
+    finished frames, e.g. in the frame cache, so that dropping them loses no work."""
+
+    def __init__(self, decode: Callable[[int, bool], Optional[MatLike]], pool: ThreadPoolExecutor,
+                 depth: int = 8):
+        self.decode = decode
+        self.pool = pool
+        self.depth: int = depth
+
+        self.pending: OrderedDict[tuple[int, bool], Future] = OrderedDict()
+        self._lock = Lock()
+
+    def is_pending(self, index: int, grayscale: bool) -> bool:
+        return (index, grayscale) in self.pending
+
+    def take(self, index: int, grayscale: bool) -> Optional[MatLike]:
+        """Return the prefetched frame, waiting for it if it is still being decoded. None if the
+        frame was not scheduled."""
+        with self._lock:
+            future = self.pending.pop((index, grayscale), None)
+        if future is None or future.cancelled():
+            return None
+        return future.result()
+
+    def schedule(self, indices: list[int], grayscale: bool, keep: Callable[[int], bool]):
+        """Decode the given upcoming frames (in play order) of the grayscale mode. Pending frames
+        for which keep is False, i.e. behind the readers after seeks and direction changes, are
+        dropped, others may still be read by another window."""
+        with self._lock:
+            indices = indices[:self.depth]
+            wanted = set(indices)
+            for key in list(self.pending):
+                if key[1] == grayscale and key[0] not in wanted and not keep(key[0]):
+                    self.pending.pop(key).cancel()
+
+            for index in indices:
+                if (index, grayscale) not in self.pending:
+                    self.pending[(index, grayscale)] = self.pool.submit(self.decode, index, grayscale)
+
+    def invalidate(self):
+        with self._lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending.clear()
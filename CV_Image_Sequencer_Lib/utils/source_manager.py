@@ -1,30 +1,151 @@
+import math
 import os
-from PySide6.QtCore import QObject, QTimer, Signal
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Hashable, Optional
+from threading import RLock
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
 from PySide6.QtGui import QImage
 import cv2 as cv
+import numpy as np
 from cv2.typing import MatLike
 
+from ..core.cache import LRUCache
 from ..core.types import ColorImage, GrayScaleImage
+from .directory_index import DirectoryIndex, load_directory_index, scan_directory
+from .frame_store import (FrameStore, Hdf5FrameStore, NpyFrameStore, TiffFrameStore,
+                          is_npy_frame_store, split_hdf5_path, to_mode)
+from .prefetcher import FramePrefetcher
+from .tiff import TIFF_EXTENSIONS, read_tiff
+from .video_index import VideoIndex, load_or_build_video_index
+from .watch_folder import WATCH_CATCH_UP, WATCH_LATEST, FolderWatcher
+
+# decoded frames shared by all source managers, nodes and workflow tabs of the process
+FRAME_CACHE = LRUCache(budget=512 * 1024**2)
+
+# generation per source path and state of the source: cached frames and results are keyed by it
+# so that they are not reused once a file is replaced or a directory lists other files, while
+# source managers loading the same unchanged source share them
+_source_generations: dict[tuple[str, Hashable], int] = {}
+
+
+def _source_generation(path: str, state: Hashable) -> int:
+    return _source_generations.setdefault((path, state), len(_source_generations))
+
+
+def _file_state(path: str) -> tuple:
+    """Modification time and size of a file, or of the files of a directory like a frame store."""
+    try:
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            return (stat.st_mtime_ns, stat.st_size)
+        with os.scandir(path) as it:
+            return tuple(sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                                for entry in it if entry.is_file()))
+    except OSError:
+        return ()
+
+
+class FrameRingBuffer:
+    """Holds the last `capacity` decoded frames by their frame index."""
+
+    def __init__(self, capacity: int = 1):
+        self.capacity: int = capacity
+        self.frames: OrderedDict[int, MatLike] = OrderedDict()
+
+    def get(self, index: int) -> Optional[MatLike]:
+        return self.frames.get(index)
+
+    def put(self, index: int, frame: MatLike):
+        self.frames[index] = frame
+        while len(self.frames) > self.capacity:
+            self.frames.popitem(last=False)
+
+    def clear(self):
+        self.frames.clear()
+
+
+# reduced resolution decoding of cv.imread for the proxy scales
+_REDUCED_FLAGS = {
+    (2, True): cv.IMREAD_REDUCED_GRAYSCALE_2, (2, False): cv.IMREAD_REDUCED_COLOR_2,
+    (4, True): cv.IMREAD_REDUCED_GRAYSCALE_4, (4, False): cv.IMREAD_REDUCED_COLOR_4,
+    (8, True): cv.IMREAD_REDUCED_GRAYSCALE_8, (8, False): cv.IMREAD_REDUCED_COLOR_8,
+}
+PROXY_SCALES = (1, 2, 4, 8)
+
 
 class SourceManager(QObject):
     frame_ready = Signal(ColorImage)
+    proxy_scale_changed = Signal(int)
+    # path and future of a directory indexed by load_directory_async, emitted from the decode pool
+    directory_indexed = Signal(str, object)
 
-    def __init__(self):
+    def __init__(self, decode_workers: Optional[int] = None):
         super().__init__()
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.get_frame)
+        # real time playback, see start_realtime
+        self.realtime_timer = QTimer()
+        self.realtime_timer.setSingleShot(True)
+        self.realtime_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.realtime_timer.timeout.connect(self._realtime_tick)
+        self.realtime_playing: bool = False
+        self.target_fps: float = 60.0
+        # time and frame index playback was started at, frame deadlines are relative to them
+        self.playback_start: tuple[float, int] = (0.0, 0)
+        self.playback_times: deque[float] = deque(maxlen=30)
+        self.frames_skipped: int = 0
 
         self.video_mode: bool = True
 
         self.video_capture = None
+        self.video_index: Optional[VideoIndex] = None
+        self.source_path: Optional[str] = None
+        # see _source_generation, part of the cache keys of frames and results
+        self.source_generation: int = -1
         self.image_directory = None
         self.image_files = []
+        self.image_mtimes = []
+        # random access source of frames, e.g. a converted directory, used instead of video and directory
+        self.frame_store: Optional[FrameStore] = None
 
         self.current_frame_idx: int = 0
         self.current_frame = None
         self.n_frames: int = 0
         self.loop_mode: bool = True
+        # frames are decoded at 1/proxy_scale of their resolution for interactive editing
+        self.proxy_scale: int = 1
+        self.read_lock = RLock()
+        # index of the frame the next video_capture.read() returns
+        self.video_position: int = 0
+        # forward gaps up to this many frames are decoded through instead of seeking, the decoded
+        # frames are kept as lookahead
+        self.video_lookahead: int = 8
+        self.video_lookahead_frames: OrderedDict[int, MatLike] = OrderedDict()
+        # recently decoded frames per grayscale mode, so that sliding windows only decode new frames
+        self.frame_buffers: dict[bool, FrameRingBuffer] = {True: FrameRingBuffer(), False: FrameRingBuffer()}
+        # images of a directory are decoded on this pool, cv.imread releases the GIL
+        if decode_workers is None:
+            decode_workers = min(8, os.cpu_count() or 1)
+        self.decode_workers: int = decode_workers
+        self.decode_pool = ThreadPoolExecutor(self.decode_workers, thread_name_prefix="decode")
+        # decodes upcoming images of a directory in play direction while the current one is shown
+        self.prefetcher = FramePrefetcher(self._prefetch_image, self.decode_pool, depth=8)
+
+        # live ingestion of a watched directory, see watch_directory
+        self.folder_watcher: Optional[FolderWatcher] = None
+        self.watch_policy: str = WATCH_CATCH_UP
+        self.watch_backlog: deque[int] = deque(maxlen=16)
+        self.frames_dropped: int = 0
+        self.ingest_timer = QTimer()
+        self.ingest_timer.setSingleShot(True)
+        self.ingest_timer.timeout.connect(self._ingest)
+
+        # directory being indexed by load_directory_async, loading another source cancels it
+        self.pending_directory: Optional[str] = None
+        self.directory_indexed.connect(self._on_directory_indexed)
 
     def get_number_of_frames(self):
         return self.n_frames
@@ -35,73 +156,262 @@ class SourceManager(QObject):
             return
         if self.loop_mode and new_index >= self.n_frames: # loop mode
             new_index = 0
+        if new_index >= self.n_frames:
+            return self.stop()
         self.current_frame_idx = new_index
 
-        if self.video_mode:
-            if self.video_capture is None:
-                return 
-
-            self.video_capture.set(cv.CAP_PROP_POS_FRAMES, new_index)
-
-            ret, frame = self.video_capture.read()
-            if not ret:
-                return self.stop()
-            if grayscale:
-                frame = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
-        else:
-            if self.image_directory is None:
-                return
-            if grayscale:
-                frame = cv.imread(os.path.join(self.image_directory,
-                                           self.image_files[self.current_frame_idx]),
-                                  cv.IMREAD_GRAYSCALE)
-            else:
-                frame = cv.imread(os.path.join(self.image_directory,
-                                           self.image_files[self.current_frame_idx]))
+        with self.read_lock:
+            frame = self._read_frame(new_index, grayscale)
+        if frame is None:
+            return self.stop()
 
         self.current_frame = frame
+        self._prefetch(new_index, 1 if offset >= 0 else -1, grayscale)
         self.frame_ready.emit(ColorImage(value=frame))
 
-    def get_next_n_frames(self, n, offset: int = 0, grayscale: bool = False):
+    def get_next_n_frames(self, n, offset: int = 0, grayscale: bool = False,
+                          frame_idx: Optional[int] = None):
+        if frame_idx is None:
+            frame_idx = self.current_frame_idx
         indices = []
         for i in range(n):
-            new_index = self.current_frame_idx + i + offset
+            new_index = frame_idx + i + offset
             if new_index < 0:
                 return
             if self.loop_mode and new_index >= self.n_frames: # loop mode
                 new_index = 0
+            if new_index >= self.n_frames:
+                return
             indices.append(new_index)
 
         output = []
-        if self.video_mode:
-            if self.video_capture is None:
-                return 
+        # the video capture is shared by all readers, e.g. the stages of a pipelined run
+        with self.read_lock:
+            frame_buffer = self.frame_buffers[grayscale]
+            frame_buffer.capacity = max(frame_buffer.capacity, n + abs(offset))
+            if self.frame_store is not None:
+                self.frame_store.reserve(n + abs(offset))
+            if not self.video_mode and self.image_directory is not None:
+                self._decode_images(indices, grayscale)
+                self._prefetch(indices[-1], 1, grayscale, indices[0])
             for index in indices:
-                self.video_capture.set(cv.CAP_PROP_POS_FRAMES, index)
-                ret, frame = self.video_capture.read()
-                if not ret:
-                    self.stop()
+                frame = self._read_frame(index, grayscale)
+                if frame is None:
+                    if self.video_mode:
+                        self.stop()
                     return
                 if grayscale:
-                    frame = GrayScaleImage(value=cv.cvtColor(frame, cv.COLOR_BGR2GRAY))
+                    output.append(GrayScaleImage(value=frame))
                 else:
-                    frame = ColorImage(value=frame)
-                output.append(frame)
-            self.video_capture.set(cv.CAP_PROP_POS_FRAMES, self.current_frame_idx)
+                    output.append(ColorImage(value=frame))
+        return output
+
+    def _read_frame(self, index: int, grayscale: bool) -> Optional[MatLike]:
+        """Decode a single frame, reusing it if it is still in the ring buffer. The returned
+        frame is shared with other readers and therefore read only."""
+        if self.frame_store is not None:
+            # frames of a store are views that need no buffering
+            frame = self.frame_store.read(index)
+            if frame is None:
+                return
+            return self._reduce(to_mode(frame, grayscale))
+
+        frame_buffer = self.frame_buffers[grayscale]
+        frame = frame_buffer.get(index)
+        if frame is not None:
+            return frame
+
+        frame_key = self._frame_key(index)
+        frame = FRAME_CACHE.get((frame_key, grayscale))
+        # gray video frames are always converted from color; images are decoded as gray instead,
+        # which differs from converting them, so they are not derived from cached color images
+        if frame is None and grayscale and self.video_mode:
+            color_frame = FRAME_CACHE.get((frame_key, False))
+            if color_frame is not None:
+                frame = cv.cvtColor(color_frame, cv.COLOR_BGR2GRAY)
+                frame.flags.writeable = False
+                FRAME_CACHE.put((frame_key, True), frame)
+        if frame is not None:
+            frame_buffer.put(index, frame)
+            return frame
+
+        if self.video_mode:
+            frame = self._read_video_frame(index)
+            if frame is None:
+                return
+            frame = self._reduce(frame)
+            if grayscale:
+                # the color frame is kept as well, a color read of it would otherwise seek back
+                self._store_frame(index, False, frame)
+                frame = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
         else:
             if self.image_directory is None:
                 return
-            for index in indices:
-                if grayscale:
-                    frame = GrayScaleImage(value=cv.imread(os.path.join(self.image_directory,
-                                               self.image_files[index]),
-                                      cv.IMREAD_GRAYSCALE))
-                else:
-                    frame = ColorImage(value=cv.imread(os.path.join(self.image_directory,
-                                               self.image_files[index])))
-                output.append(frame)
-        return output
+            frame = self.prefetcher.take(index, grayscale)
+            if frame is None:
+                frame = self._decode_image(index, grayscale)
+            if frame is None:
+                return
+
+        self._store_frame(index, grayscale, frame)
+        return frame
+
+    def _store_frame(self, index: int, grayscale: bool, frame: MatLike):
+        frame.flags.writeable = False
+        self.frame_buffers[grayscale].put(index, frame)
+        FRAME_CACHE.put((self._frame_key(index), grayscale), frame)
+
+    def _is_decoded(self, index: int, grayscale: bool) -> bool:
+        if self.frame_buffers[grayscale].get(index) is not None:
+            return True
+        frame_key = self._frame_key(index)
+        return (frame_key, grayscale) in FRAME_CACHE or (grayscale and self.video_mode and
+                                                         (frame_key, False) in FRAME_CACHE)
+
+    def _is_available(self, index: int, grayscale: bool) -> bool:
+        """True if the frame is decoded or being decoded by the prefetcher."""
+        return self._is_decoded(index, grayscale) or self.prefetcher.is_pending(index, grayscale)
+
+    def _decode_images(self, indices: list[int], grayscale: bool):
+        """Decode the missing images of a window in parallel on the decode pool."""
+        missing = [i for i in dict.fromkeys(indices) if not self._is_available(i, grayscale)]
+        if len(missing) < 2 or self.decode_workers < 2:
+            return
+        frames = self.decode_pool.map(lambda i: self._decode_image(i, grayscale), missing)
+        for index, frame in zip(missing, frames):
+            if frame is not None:
+                self._store_frame(index, grayscale, frame)
+
+    def set_decode_workers(self, n_workers: int):
+        self.prefetcher.invalidate()
+        old_pool = self.decode_pool
+        self.decode_workers = max(1, n_workers)
+        self.decode_pool = ThreadPoolExecutor(self.decode_workers, thread_name_prefix="decode")
+        self.prefetcher.pool = self.decode_pool
+        old_pool.shutdown(wait=False)
+
+    def source_key(self) -> tuple:
+        """Identifies the loaded source and its state across source managers."""
+        return (self.source_path, self.source_generation)
+
+    def _frame_key(self, index: int):
+        """Identifies a frame across source managers. Images are identified by their path and
+        modification time so that keys stay valid if the file list changes or a file is rewritten.
+        Proxy frames have their own keys."""
+        if self.video_mode:
+            return (self.source_key(), index, self.proxy_scale)
+        return (os.path.join(self.image_directory, self.image_files[index]), self.image_mtimes[index],
+                self.proxy_scale)
+
+    def _decode_image(self, index: int, grayscale: bool) -> Optional[MatLike]:
+        """Decode an image of the directory. Thread safe, used by the prefetcher."""
+        path = os.path.join(self.image_directory, self.image_files[index])
+        if self.proxy_scale > 1:
+            return cv.imread(path, _REDUCED_FLAGS[(self.proxy_scale, grayscale)])
+        if path.lower().endswith(TIFF_EXTENSIONS):
+            frame = read_tiff(path, grayscale)
+            if frame is not None:
+                return frame
+        if grayscale:
+            return cv.imread(path, cv.IMREAD_GRAYSCALE)
+        return cv.imread(path)
+
+    def _prefetch_image(self, index: int, grayscale: bool) -> Optional[MatLike]:
+        """Decode for the prefetcher. The frame is put into the frame cache so that it is not lost
+        if the prefetcher drops it before it is taken."""
+        frame_key = self._frame_key(index)
+        frame = self._decode_image(index, grayscale)
+        # the proxy scale may have changed while decoding
+        if frame is not None and frame_key == self._frame_key(index):
+            frame.flags.writeable = False
+            FRAME_CACHE.put((frame_key, grayscale), frame)
+        return frame
+
+    def _reduce(self, frame: MatLike) -> MatLike:
+        if self.proxy_scale == 1:
+            return frame
+        return cv.resize(frame, None, fx=1 / self.proxy_scale, fy=1 / self.proxy_scale,
+                         interpolation=cv.INTER_AREA)
+
+    def set_proxy_scale(self, scale: int):
+        """Decode frames at 1/scale of their resolution, 1 for full resolution. Emits
+        proxy_scale_changed before the current frame is emitted again at the new scale."""
+        if scale not in PROXY_SCALES:
+            raise ValueError(f"Proxy scale has to be one of {PROXY_SCALES}")
+        if scale == self.proxy_scale:
+            return
+        self.proxy_scale = scale
+        self.clear_frame_buffers()
+        self.proxy_scale_changed.emit(scale)
+        if self.n_frames > 0:
+            self.get_frame(0)
 
+    def set_prefetch_depth(self, depth: int):
+        self.prefetcher.invalidate()
+        self.prefetcher.depth = depth
+
+    def _prefetch(self, index: int, direction: int, grayscale: bool, read_from: Optional[int] = None):
+        """Prefetch the frames after index. Pending frames from read_from, the first frame of the
+        window just read, up to the prefetched ones are kept for other windows."""
+        if self.video_mode or self.frame_store is not None or self.prefetcher.depth <= 0:
+            return
+        if read_from is None:
+            read_from = index
+
+        def ahead(i: int) -> int:
+            distance = (i - read_from) * direction
+            return distance % self.n_frames if self.loop_mode else distance
+
+        last_ahead = ahead(index) + self.prefetcher.depth
+        indices = []
+        for i in range(1, self.prefetcher.depth + 1):
+            new_index = index + i * direction
+            if self.loop_mode:
+                new_index %= self.n_frames
+            elif not 0 <= new_index < self.n_frames:
+                break
+            if not self._is_decoded(new_index, grayscale):
+                indices.append(new_index)
+        self.prefetcher.schedule(indices, grayscale, lambda i: 0 <= ahead(i) <= last_ahead)
+
+    def _read_video_frame(self, index: int) -> Optional[MatLike]:
+        """Read a BGR frame from the video. Seeking re-decodes from the previous keyframe, so it is
+        only done for backward jumps and jumps beyond the lookahead. With a video index the seek
+        goes to the keyframe before the frame and decodes forward from there."""
+        if self.video_capture is None:
+            return
+        frame = self.video_lookahead_frames.pop(index, None)
+        if frame is not None:
+            return frame
+
+        gap = index - self.video_position
+        if gap < 0 or gap > self.video_lookahead:
+            keyframe = index
+            if self.video_index is not None:
+                keyframe = self.video_index.keyframe_before(index)
+            # decoding forward within the same group of pictures is never slower than seeking
+            if not keyframe <= self.video_position <= index:
+                self.video_capture.set(cv.CAP_PROP_POS_FRAMES, keyframe)
+                self.video_position = keyframe
+                self.video_lookahead_frames.clear()
+
+        while self.video_position <= index:
+            ret, frame = self.video_capture.read()
+            if not ret:
+                return
+            if self.video_position < index:
+                self.video_lookahead_frames[self.video_position] = frame
+                while len(self.video_lookahead_frames) > self.video_lookahead:
+                    self.video_lookahead_frames.popitem(last=False)
+            self.video_position += 1
+        return frame
+
+    def clear_frame_buffers(self):
+        with self.read_lock:
+            for frame_buffer in self.frame_buffers.values():
+                frame_buffer.clear()
+            self.video_lookahead_frames.clear()
+        self.prefetcher.invalidate()
 
     def emit_frame(self):
         if self.current_frame is not None:
@@ -112,13 +422,115 @@ class SourceManager(QObject):
 
     def stop(self):
         self.timer.stop()
+        self.realtime_playing = False
+        self.realtime_timer.stop()
 
     def start(self, interval=30):
         if self.video_capture and self.video_capture.isOpened():
             self.timer.start(interval)
-        elif not self.image_directory is None:
+        elif not self.image_directory is None or self.frame_store is not None:
             self.timer.start(interval)
 
+    def start_realtime(self, fps: float = 60.0):
+        """Play at the given frame rate. Every frame has a deadline; if emitting a frame (and
+        evaluating the workflow connected to frame_ready) takes too long, the frames whose
+        deadline passed are skipped and only the newest one is shown."""
+        if self.n_frames == 0:
+            return
+        self.target_fps = fps
+        self.playback_start = (time.perf_counter(), self.current_frame_idx)
+        self.playback_times.clear()
+        self.frames_skipped = 0
+        self.realtime_playing = True
+        self.realtime_timer.start(0)
+
+    def get_achieved_fps(self) -> float:
+        if len(self.playback_times) < 2:
+            return 0.0
+        return (len(self.playback_times) - 1) / (self.playback_times[-1] - self.playback_times[0])
+
+    def _realtime_tick(self):
+        start_time, start_idx = self.playback_start
+        now = time.perf_counter()
+        target_idx = start_idx + int((now - start_time) * self.target_fps)
+        if target_idx >= self.n_frames:
+            if not self.loop_mode:
+                return self.stop()
+            start_time, start_idx, target_idx = now, 0, 0
+            self.playback_start = (start_time, start_idx)
+
+        if target_idx != self.current_frame_idx or not self.playback_times:
+            self.frames_skipped += max(0, target_idx - self.current_frame_idx - 1)
+            self.get_frame(target_idx - self.current_frame_idx)
+            self.playback_times.append(time.perf_counter())
+        # get_frame stops playback if the frame cannot be read
+        if self.realtime_playing:
+            next_deadline = start_time + (target_idx - start_idx + 1) / self.target_fps
+            self.realtime_timer.start(max(0, math.ceil((next_deadline - time.perf_counter()) * 1000)))
+
+    def load_source(self, path: str):
+        """Load a frame store, HDF5 file (`container.h5:/dataset` selects the dataset), multi page
+        TIFF, image directory or video depending on the path."""
+        hdf5_path = split_hdf5_path(path)
+        if hdf5_path is not None:
+            self.load_hdf5(*hdf5_path)
+        elif is_npy_frame_store(path):
+            self.load_store(path)
+        elif path.lower().endswith(TIFF_EXTENSIONS):
+            self.load_tiff(path)
+        elif os.path.isdir(path):
+            self.load_directory(path)
+        else:
+            self.load_video(path)
+
+    def _close_frame_store(self):
+        if self.frame_store is not None:
+            self.frame_store.close()
+            self.frame_store = None
+
+    def load_store(self, path: str):
+        try:
+            self._open_frame_store(NpyFrameStore(path), path, path)
+        except Exception as e:
+            print(e)
+
+    def load_tiff(self, path: str):
+        try:
+            self._open_frame_store(TiffFrameStore(path), path, path)
+        except Exception as e:
+            print(e)
+
+    def load_hdf5(self, path: str, dataset: Optional[str] = None):
+        try:
+            store = Hdf5FrameStore(path, dataset)
+        except ImportError:
+            print("ERROR: h5py package not found. Please install it.")
+            return
+        except Exception as e:
+            print(e)
+            return
+        try:
+            # the dataset is part of the source path, cached results must not mix datasets
+            self._open_frame_store(store, f"{path}:{store.dataset.name}", path)
+        except Exception as e:
+            store.close()
+            print(e)
+
+    def _open_frame_store(self, store: FrameStore, path: str, file_path: str):
+        if store.n_frames == 0:
+            raise ValueError("The frame store is empty.")
+        self._close_frame_store()
+        self.stop_watching()
+        self.frame_store = store
+        self.pending_directory = None
+        self.image_directory = None
+        self.video_mode = False
+        self.source_path = path
+        self.source_generation = _source_generation(path, _file_state(file_path))
+        self.clear_frame_buffers()
+        self.n_frames = store.n_frames
+        self.get_frame()
+
     def load_video(self, path: str):
         try:
             self.video_capture = cv.VideoCapture(path)
@@ -128,35 +540,137 @@ class SourceManager(QObject):
                 # TODO: Warning
                 return 
 
-            self.n_frames = int(self.video_capture.get(cv.CAP_PROP_FRAME_COUNT))
+            self.video_index = load_or_build_video_index(path)
+            if self.video_index is not None:
+                self.n_frames = self.video_index.n_frames
+            else:
+                self.n_frames = int(self.video_capture.get(cv.CAP_PROP_FRAME_COUNT))
+            self._close_frame_store()
+            self.stop_watching()
             self.video_mode = True
+            self.pending_directory = None
+            self.source_path = path
+            self.source_generation = _source_generation(path, _file_state(path))
+            self.video_position = 0
+            self.clear_frame_buffers()
             self.get_frame()
         except Exception as e:
             print(e)
             pass
 
-    def _check_img_file_type(self, file: str) -> bool:
-        if file.endswith(".png") or file.endswith(".jpg") or file.endswith(".tiff"):
-            return True
-        return False
-
     def load_directory(self, path: str):
         if not os.path.isdir(path):
             raise ValueError("Invalid path: No directory")
         try:
-            files = [f for f in os.listdir(path) if self._check_img_file_type(f)]
-            if not files:
-                raise ValueError("No valid image files could be found in the directory.")
-            self.image_directory = path
-            self.image_files = files
-            self.video_mode = False
-            self.n_frames = len(files)
-            self.get_frame()
+            self._open_directory(path, load_directory_index(path))
         except Exception as e:
             print(e)
             pass
 
+    def load_directory_async(self, path: str):
+        """Index the directory on the decode pool and load it once the index is ready, so that the
+        GUI stays responsive while a large directory is scanned."""
+        if not os.path.isdir(path):
+            raise ValueError("Invalid path: No directory")
+        self.pending_directory = path
+        future = self.decode_pool.submit(load_directory_index, path)
+        future.add_done_callback(lambda f: self.directory_indexed.emit(path, f))
+
+    def _on_directory_indexed(self, path: str, future: Future):
+        if path != self.pending_directory:
+            return
+        try:
+            self._open_directory(path, future.result())
+        except Exception as e:
+            print(e)
+
+    def _open_directory(self, path: str, index: DirectoryIndex):
+        files = index.files
+        if not files:
+            raise ValueError("No valid image files could be found in the directory.")
+        self.pending_directory = None
+        self.image_directory = path
+        self.image_files = files
+        self.image_mtimes = index.mtimes
+        self._close_frame_store()
+        self.stop_watching()
+        self.video_mode = False
+        self.source_path = path
+        self.source_generation = _source_generation(path, (tuple(files), tuple(index.mtimes)))
+        self.clear_frame_buffers()
+        self.n_frames = len(files)
+        self.get_frame()
+
+    def watch_directory(self, path: str, policy: str = WATCH_CATCH_UP, max_backlog: int = 16):
+        """Show the images of the directory and every image added to it once it is completely
+        written. New frames are emitted through frame_ready, which runs the workflow on them. At
+        most max_backlog frames wait for processing, older ones are dropped. With the
+        WATCH_LATEST policy only the newest waiting frame is processed."""
+        if not os.path.isdir(path):
+            raise ValueError("Invalid path: No directory")
+        # the sidecar index is not kept up to date for a directory that changes all the time
+        index = scan_directory(path)
+        self.pending_directory = None
+        self._close_frame_store()
+        self.stop_watching()
+        self.image_directory = path
+        self.image_files = index.files
+        self.image_mtimes = index.mtimes
+        self.video_mode = False
+        self.source_path = path
+        # files are only appended while watching, the indices of the listed files stay valid
+        self.source_generation = _source_generation(path, (tuple(index.files), tuple(index.mtimes)))
+        self.clear_frame_buffers()
+        self.n_frames = len(index.files)
+
+        self.watch_policy = policy
+        self.watch_backlog = deque(maxlen=max_backlog)
+        self.frames_dropped = 0
+        self.folder_watcher = FolderWatcher(path, index.files)
+        self.folder_watcher.files_ready.connect(self._on_files_ready)
+        if self.n_frames > 0:
+            self.get_frame(self.n_frames - 1 - self.current_frame_idx)
+
+    def stop_watching(self):
+        if self.folder_watcher is None:
+            return
+        self.folder_watcher.stop()
+        self.folder_watcher.deleteLater()
+        self.folder_watcher = None
+        self.ingest_timer.stop()
+        self.watch_backlog.clear()
+
+    def _on_files_ready(self, files: list[tuple[str, float]]):
+        for name, mtime in files:
+            self.image_files.append(name)
+            self.image_mtimes.append(mtime)
+            if len(self.watch_backlog) == self.watch_backlog.maxlen:
+                self.frames_dropped += 1
+            self.watch_backlog.append(len(self.image_files) - 1)
+        self.n_frames = len(self.image_files)
+        if not self.ingest_timer.isActive():
+            self.ingest_timer.start(0)
+
+    def _ingest(self):
+        """Process one frame of the backlog. The next one is scheduled through the event loop so
+        that the UI stays responsive while catching up."""
+        if not self.watch_backlog:
+            return
+        if self.watch_policy == WATCH_LATEST:
+            index = self.watch_backlog.pop()
+            self.frames_dropped += len(self.watch_backlog)
+            self.watch_backlog.clear()
+        else:
+            index = self.watch_backlog.popleft()
+        self.get_frame(index - self.current_frame_idx)
+        if self.watch_backlog:
+            self.ingest_timer.start(0)
+
+
 def convert_cv_to_qt(image: MatLike) -> QImage:
+    if image.dtype == np.uint16:
+        # only the displayed image is reduced to 8 bit
+        image = (image >> 8).astype(np.uint8)
     if image.ndim == 2: # grayscale
         h, w = image.shape
         return QImage(image.data, w, h, w, QImage.Format.Format_Grayscale8)
@@ -0,0 +1,139 @@
+import struct
+from dataclasses import dataclass, replace
+from typing import Optional
+import cv2 as cv
+import numpy as np
+
+TIFF_EXTENSIONS = (".tif", ".tiff")
+
+# tags needed to locate the pixel data of a page
+_WIDTH = 256
+_HEIGHT = 257
+_BITS_PER_SAMPLE = 258
+_COMPRESSION = 259
+_PHOTOMETRIC = 262
+_STRIP_OFFSETS = 273
+_SAMPLES_PER_PIXEL = 277
+_STRIP_BYTE_COUNTS = 279
+_PLANAR_CONFIG = 284
+_TILE_WIDTH = 322
+_SAMPLE_FORMAT = 339
+
+_TYPE_FORMATS = {1: "B", 3: "H", 4: "I"}
+
+
+@dataclass
+class TiffPage:
+    """Location of the pixel data of an uncompressed page, which can be viewed in place."""
+    offset: int
+    shape: tuple
+    dtype: np.dtype
+    rgb: bool
+
+
+def _read_tags(f, byte_order: str, ifd_offset: int) -> tuple[dict[int, tuple], int]:
+    f.seek(ifd_offset)
+    n_entries, = struct.unpack(byte_order + "H", f.read(2))
+    entries = f.read(12 * n_entries)
+    next_offset, = struct.unpack(byte_order + "I", f.read(4))
+
+    tags = {}
+    for i in range(n_entries):
+        tag, type_, count = struct.unpack(byte_order + "HHI", entries[12 * i:12 * i + 8])
+        fmt = _TYPE_FORMATS.get(type_)
+        if fmt is None:
+            continue
+        size = struct.calcsize(fmt) * count
+        if size <= 4:
+            data = entries[12 * i + 8:12 * i + 8 + size]
+        else:
+            offset, = struct.unpack(byte_order + "I", entries[12 * i + 8:12 * i + 12])
+            position = f.tell()
+            f.seek(offset)
+            data = f.read(size)
+            f.seek(position)
+        tags[tag] = struct.unpack(f"{byte_order}{count}{fmt}", data)
+    return tags, next_offset
+
+
+def _page_from_tags(tags: dict[int, tuple], byte_order: str) -> Optional[TiffPage]:
+    """None if the pixel data is compressed, tiled, planar or split into non contiguous strips."""
+    samples = tags.get(_SAMPLES_PER_PIXEL, (1,))[0]
+    bits = tags.get(_BITS_PER_SAMPLE, (1,))[0]
+    if (tags.get(_COMPRESSION, (1,))[0] != 1 or _TILE_WIDTH in tags
+            or tags.get(_PLANAR_CONFIG, (1,))[0] != 1 or tags.get(_SAMPLE_FORMAT, (1,))[0] != 1
+            or samples not in (1, 3) or bits not in (8, 16)
+            or tags.get(_PHOTOMETRIC, (1,))[0] not in (1, 2) or _STRIP_OFFSETS not in tags):
+        return None
+
+    offsets = tags[_STRIP_OFFSETS]
+    counts = tags.get(_STRIP_BYTE_COUNTS)
+    if counts is None:
+        return None
+    for i in range(len(offsets) - 1):
+        if offsets[i] + counts[i] != offsets[i + 1]:
+            return None
+
+    shape = (tags[_HEIGHT][0], tags[_WIDTH][0]) + ((3,) if samples == 3 else ())
+    dtype = np.dtype(byte_order + ("u1" if bits == 8 else "u2"))
+    if dtype.itemsize * int(np.prod(shape)) > sum(counts):
+        return None
+    return TiffPage(offsets[0], shape, dtype, samples == 3)
+
+
+def read_tiff_pages(path: str) -> list[Optional[TiffPage]]:
+    """Parse the image file directories of a classic (not Big) TIFF. Returns one entry per page,
+    None for pages that cannot be memory mapped."""
+    pages = []
+    with open(path, "rb") as f:
+        header = f.read(8)
+        if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+            raise ValueError(f"Not a TIFF file: {path}")
+        byte_order = "<" if header[:2] == b"II" else ">"
+        magic, ifd_offset = struct.unpack(byte_order + "HI", header[2:])
+        if magic != 42:
+            raise ValueError(f"Unsupported TIFF variant: {path}")
+
+        seen = set()
+        while ifd_offset != 0 and ifd_offset not in seen:
+            seen.add(ifd_offset)
+            tags, ifd_offset = _read_tags(f, byte_order, ifd_offset)
+            pages.append(_page_from_tags(tags, byte_order))
+    return pages
+
+
+def map_tiff_page(buffer: np.ndarray, page: TiffPage) -> np.ndarray:
+    """Read only view of the pixel data of the page, RGB pages are converted to BGR."""
+    frame = np.ndarray(page.shape, page.dtype, buffer=buffer, offset=page.offset)
+    if not page.dtype.isnative:
+        frame = frame.astype(page.dtype.newbyteorder("="))
+    if page.rgb:
+        frame = cv.cvtColor(frame, cv.COLOR_RGB2BGR)
+    frame.flags.writeable = False
+    return frame
+
+
+def read_tiff(path: str, grayscale: bool) -> Optional[np.ndarray]:
+    """Read an uncompressed 8 bit single page TIFF without decoding, the frame matches cv.imread.
+    The page is read into an array of its own, a memory map per frame would keep a file
+    descriptor open for as long as the frame is cached. None if the file has to be decoded by
+    cv.imread instead."""
+    try:
+        pages = read_tiff_pages(path)
+        if len(pages) != 1 or pages[0] is None or pages[0].dtype != np.uint8:
+            return None
+        page = pages[0]
+        # cv.imread converts color TIFFs to grayscale with a different rounding
+        if page.rgb and grayscale:
+            return None
+        data = np.empty(page.dtype.itemsize * int(np.prod(page.shape)), np.uint8)
+        with open(path, "rb") as f:
+            f.seek(page.offset)
+            if f.readinto(data) != data.size:
+                return None
+    except (OSError, ValueError, struct.error):
+        return None
+    frame = map_tiff_page(data, replace(page, offset=0))
+    if not page.rgb and not grayscale:
+        return cv.cvtColor(frame, cv.COLOR_GRAY2BGR)
+    return frame
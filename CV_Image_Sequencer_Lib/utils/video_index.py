@@ -0,0 +1,79 @@
+import json
+import os
+from bisect import bisect_right
+from dataclasses import asdict, dataclass
+from typing import Optional
+import cv2 as cv
+
+INDEX_SUFFIX = ".cvis_index.json"
+
+
+@dataclass
+class VideoIndex:
+    """Keyframe positions and timestamps of a video, stored next to the video as sidecar file."""
+    n_frames: int
+    keyframes: list[int]
+    timestamps_ms: list[float]
+    # size and modification time of the indexed video, used to detect stale sidecar files
+    file_size: int
+    file_mtime: float
+
+    def keyframe_before(self, index: int) -> int:
+        """Index of the last keyframe at or before the given frame."""
+        pos = bisect_right(self.keyframes, index)
+        if pos == 0:
+            return 0
+        return self.keyframes[pos - 1]
+
+    def save(self, path: str):
+        with open(path + INDEX_SUFFIX, "w") as f:
+            json.dump(asdict(self), f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["VideoIndex"]:
+        try:
+            with open(path + INDEX_SUFFIX, "r") as f:
+                index = cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        stat = os.stat(path)
+        if index.file_size != stat.st_size or index.file_mtime != stat.st_mtime:
+            return None
+        return index
+
+
+def build_video_index(path: str) -> Optional[VideoIndex]:
+    """Scan all packets of the video without decoding them (FFmpeg raw mode) and record which
+    frames are keyframes. Returns None if the backend cannot report keyframes."""
+    capture = cv.VideoCapture(path, cv.CAP_FFMPEG, [cv.CAP_PROP_FORMAT, -1])
+    if not capture.isOpened():
+        return None
+
+    keyframes = []
+    timestamps = []
+    try:
+        while capture.grab():
+            if capture.get(cv.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(len(timestamps))
+            timestamps.append(capture.get(cv.CAP_PROP_POS_MSEC))
+    finally:
+        capture.release()
+
+    if not keyframes:
+        return None
+    stat = os.stat(path)
+    return VideoIndex(len(timestamps), keyframes, timestamps, stat.st_size, stat.st_mtime)
+
+
+def load_or_build_video_index(path: str) -> Optional[VideoIndex]:
+    index = VideoIndex.load(path)
+    if index is not None:
+        return index
+
+    index = build_video_index(path)
+    if index is not None:
+        try:
+            index.save(path)
+        except OSError as e:
+            print(f"Could not write video index: {e}")
+    return index
@@ -0,0 +1,69 @@
+import os
+from typing import Iterable
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from .directory_index import is_image_file, natural_sort_key
+
+# policies for frames that arrive faster than the workflow processes them
+WATCH_CATCH_UP = "catch_up"
+WATCH_LATEST = "latest"
+
+
+class FolderWatcher(QObject):
+    """Reports image files added to a directory once they are completely written, i.e. their
+    size and modification time did not change between two polls."""
+    # list of (file name, mtime) in natural order
+    files_ready = Signal(list)
+
+    def __init__(self, directory: str, known: Iterable[str] = (), poll_interval: int = 250):
+        super().__init__()
+        self.directory = directory
+        self.known: set[str] = set(known)
+        # files still being written with their (size, mtime) at the last poll
+        self.pending: dict[str, tuple[int, float]] = {}
+
+        self.watcher = QFileSystemWatcher([directory])
+        self.watcher.directoryChanged.connect(self.scan)
+        self.poll_timer = QTimer()
+        self.poll_timer.setInterval(poll_interval)
+        self.poll_timer.timeout.connect(self.poll)
+
+    def scan(self):
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if name not in self.known and name not in self.pending and is_image_file(name):
+                        self.pending[name] = (-1, -1.0)
+        except OSError as e:
+            print(f"Could not scan watched directory: {e}")
+        if self.pending and not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def poll(self):
+        ready = []
+        for name, last in list(self.pending.items()):
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                # removed or renamed before it was complete
+                del self.pending[name]
+                continue
+            current = (stat.st_size, stat.st_mtime)
+            if current == last and stat.st_size > 0:
+                del self.pending[name]
+                self.known.add(name)
+                ready.append((name, stat.st_mtime))
+            else:
+                self.pending[name] = current
+
+        if not self.pending:
+            self.poll_timer.stop()
+        if ready:
+            ready.sort(key=lambda file: natural_sort_key(file[0]))
+            self.files_ready.emit(ready)
+
+    def stop(self):
+        self.watcher.removePath(self.directory)
+        self.poll_timer.stop()
+        self.pending.clear()